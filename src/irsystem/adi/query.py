@@ -1,4 +1,5 @@
 from base import BaseQueryReader
+from base.smart import iter_smart_records
 
 class AdiQueryReader(BaseQueryReader):
     def get_queries(self):
@@ -22,26 +23,14 @@ class AdiQueryReader(BaseQueryReader):
         ]
         """
 
-        queries = []
-        with open(self.file_path, "r") as f:
-            # Get whole sections delimited by ".I"
-            sections = f.read().split(".I")[1:]
-
-            for section in sections:
-                # Get the query_id
-                query_id = int(section.split()[0])
-
-                # Get the query
-                query = section.split(".W")[1].strip().replace("\n", " ")
-
-                queries.append(
-                    {
-                        "query_id": query_id,
-                        "query": query
-                    }
-                )
+        return [
+            {
+                "query_id": record.id,
+                "query": record.text("W", "").strip().replace("\n", " "),
+            }
+            for record in iter_smart_records(self.file_path, "W", open_field="W")
+        ]
 
-        return queries
 
 if __name__ == "__main__":
     import os
@@ -1,13 +1,14 @@
 from base import BaseDocReader
+from base.smart import iter_smart_records
 
 
 class AdiDocReader(BaseDocReader):
-    def get_docs(self):
+    def iter_docs(self):
         """
-        Parse the file into a list of documents.
+        Reads the file one document at a time.
 
-        Returns:
-            list: A list of dictionaries, where each dictionary represents a document.
+        Yields:
+            dict: A dictionary representing a document.
 
         i.e. Adi collection:
         .I 2
@@ -36,37 +37,13 @@ class AdiDocReader(BaseDocReader):
         ]
         """
 
-        docs = []
-        with open(self.file_path, "r") as f:
-            # Get whole sections delimited by ".I"
-            sections = f.read().split(".I")[1:]
-
-            for section in sections:
-                # Get the doc_id
-                doc_id = int(section.split()[0])
-
-                # Get the title
-                title = section.split(".T")[1].split(".A")[0].strip().replace("\n", " ")
-
-                # Get the author
-                if ".A" not in section:
-                    author = "Unknown"
-                else:
-                    author = section.split(".A")[1].split(".W")[0].strip()
-
-                # Get the content
-                content = section.split(".W")[1].strip()
-
-                docs.append(
-                    {
-                        "doc_id": doc_id,
-                        "title": title,
-                        "author": author,
-                        "content": content,
-                    }
-                )
-
-        return docs
+        for record in iter_smart_records(self.file_path, "TAW", open_field="W"):
+            yield {
+                "doc_id": record.id,
+                "title": record.text("T", "").strip().replace("\n", " "),
+                "author": record.text("A", "Unknown").strip(),
+                "content": record.text("W", "").strip(),
+            }
 
 
 if __name__ == "__main__":
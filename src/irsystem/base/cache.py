@@ -0,0 +1,140 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import hashlib
+import json
+import os
+import numpy as np
+from base.lexicon import Lexicon
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed collections. Each entry is an uncompressed `.npz`
+    file named after a key that covers the source file content and every
+    setting that changes the parse, so a stale entry is never loaded.
+
+    An entry holds the parsed tokens, the document IDs and the term frequency
+    matrix. Document frequencies are not stored, `TermDocMatrix` recounts
+    them with one `np.bincount` over the matrix columns on first use.
+
+    Attributes:
+        cache_dir (Path): The directory holding the cache entries.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(file_path: str, settings: Dict[str, Any]) -> str:
+        """
+        Computes the cache key of a parsed file.
+
+        Args:
+            `file_path`: the source file
+            `settings`: everything else the parse depends on, i.e. reader
+                        class, language, stemming and parser configuration
+
+        Returns:
+            A hexadecimal key.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
+
+    def stems_path(self, lang: str) -> Path:
+        """
+        Path of the persisted stem dictionary of a language, see `StemCache`.
+        """
+        return self.cache_dir / f"stems-{lang}.json"
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Loads a cache entry.
+
+        Args:
+            `key`: the entry key
+
+        Returns:
+            The stored arrays, or None if there is no entry for the key.
+        """
+        path = self.path(key)
+        if not path.exists():
+            return None
+
+        with np.load(path) as entry:
+            return dict(entry)
+
+    def save(self, key: str, arrays: Dict[str, np.ndarray]):
+        """
+        Stores a cache entry. The entry is written to a temporary file first,
+        so a concurrent reader never sees a partial file.
+
+        Args:
+            `key`: the entry key
+            `arrays`: the arrays to store
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        path = self.path(key)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def pack_tokens(token_lists: List[List[str]]) -> Dict[str, np.ndarray]:
+        """
+        Packs token lists into flat arrays: the sorted distinct tokens, the
+        position of every token among them and where each list starts. The
+        tokens are interned as they are read, see `Lexicon`.
+
+        Args:
+            `token_lists`: the tokens of each document or query
+
+        Returns:
+            The `terms`, `token_ids` and `token_offsets` arrays.
+        """
+        token_offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum([len(tokens) for tokens in token_lists], out=token_offsets[1:])
+
+        # Tokens are numbered in order of appearance, then renumbered in term order
+        lexicon = Lexicon()
+        token_ids = lexicon.intern_tokens(
+            (token for tokens in token_lists for token in tokens), int(token_offsets[-1])
+        )
+        lexicon, renumbered = lexicon.sorted()
+
+        return {
+            "terms": np.array(lexicon.terms, dtype=str),
+            "token_ids": renumbered[token_ids],
+            "token_offsets": token_offsets,
+        }
+
+    @staticmethod
+    def unpack_tokens(arrays: Dict[str, np.ndarray]) -> Tuple[List[str], List[List[str]]]:
+        """
+        Reverses `pack_tokens`.
+
+        Args:
+            `arrays`: arrays holding `terms`, `token_ids` and `token_offsets`
+
+        Returns:
+            The distinct terms and the token lists.
+        """
+        terms = arrays["terms"].tolist()
+        token_ids = arrays["token_ids"].tolist()
+        offsets = arrays["token_offsets"].tolist()
+
+        token_lists = [
+            [terms[token_id] for token_id in token_ids[start:end]]
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+        return terms, token_lists
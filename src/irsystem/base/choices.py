@@ -19,6 +19,11 @@ class NormMode(Enum):
     C = 1  # Cosine
 
 
+class TokenizerMode(Enum):
+    NLTK = 0  # nltk.word_tokenize
+    FAST = 1  # Single regex pass
+
+
 @dataclass
 class WeightingTriplet:
     """
@@ -89,3 +94,12 @@ class WeightingTriplet:
                 raise Exception(f"Invalid value for norm mode: {repr[2]}")
 
         return triplet
+
+    def to_str(self) -> str:
+        """
+        Converts the triplet back into its 3-characters string.
+
+        Returns:
+            A lowercase string representing the weighting method, i.e. `ltc`.
+        """
+        return f"{self.tf.name}{self.idf.name}{self.norm.name}".lower()
@@ -0,0 +1,119 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from scipy import sparse
+from base.choices import IDFMode, NormMode, TFMode, WeightingTriplet
+from base.lexicon import Lexicon
+from base.stats import tf_weights
+
+
+class CompiledQueries:
+    """
+    Query tokens mapped to the term IDs of a document lexicon once, so
+    that every query weighting is a few array operations over the same
+    cells instead of dictionaries rebuilt per weighting.
+
+    Each distinct term of a query is one cell. Terms missing from the
+    vocabulary can't match any document and are left out of the query
+    vectors, only their frequencies are kept: the augmented tf of a query
+    is relative to its most frequent term, and without idf its cosine norm
+    counts every term of the query.
+
+    Attributes:
+        rows (np.ndarray): The query row of each cell.
+        cols (np.ndarray): The vocabulary column of each cell, -1 for terms missing from the vocabulary.
+        tfs (np.ndarray): The term frequency of each cell.
+        idfs (np.ndarray): The idf of each cell, 0 for terms missing from the vocabulary.
+        max_tfs (np.ndarray): The highest term frequency of each query, 0 for an empty query.
+        shape (tuple): The shape of the query-term matrices, (queries, vocabulary terms).
+    """
+
+    def __init__(self, token_lists: List[List[str]], lexicon: Lexicon, idfs: np.ndarray):
+        # Terms missing from the lexicon are numbered past its end
+        all_tokens = [token for tokens in token_lists for token in tokens]
+        term_ids = lexicon.lookup(all_tokens).astype(np.int64)
+        unknown = np.flatnonzero(term_ids < 0)
+        missing = Lexicon()
+        term_ids[unknown] = len(lexicon) + missing.intern_tokens(
+            (all_tokens[position] for position in unknown.tolist()), len(unknown)
+        )
+
+        # One cell per (query, term) pair, in row then column order
+        width = len(lexicon) + len(missing)
+        token_rows = np.repeat(
+            np.arange(len(token_lists), dtype=np.int64), [len(tokens) for tokens in token_lists]
+        )
+        cells, self.tfs = np.unique(token_rows * width + term_ids, return_counts=True)
+        self.rows = cells // width
+        term_ids = cells % width
+
+        found = term_ids < len(lexicon)
+        self.cols = np.where(found, term_ids, -1)
+        self.idfs = np.zeros(len(cells), dtype=np.float64)
+        self.idfs[found] = idfs[term_ids[found]]
+        self.max_tfs = np.zeros(len(token_lists), dtype=np.int64)
+        np.maximum.at(self.max_tfs, self.rows, self.tfs)
+        self.shape = (len(token_lists), len(lexicon))
+
+        self._found = found
+        self._weights: Dict[Tuple[TFMode, IDFMode], np.ndarray] = {}
+        self._norms: Dict[Tuple[TFMode, IDFMode], np.ndarray] = {}
+
+    def weights(self, tfmode: TFMode, idfmode: IDFMode) -> np.ndarray:
+        """
+        Weights the cells, before any normalization. Cached per mode pair.
+
+        Args:
+            `tfmode`: the term frequency mode
+            `idfmode`: the inverse document frequency mode
+
+        Returns:
+            The weight of each cell.
+        """
+        key = (tfmode, idfmode)
+        if key not in self._weights:
+            max_tfs = self.max_tfs[self.rows] if tfmode == TFMode.A else None
+            values = tf_weights(self.tfs, tfmode, max_tfs)
+            if idfmode == IDFMode.T:
+                values *= self.idfs
+            self._weights[key] = values
+        return self._weights[key]
+
+    def norm(self, tfmode: TFMode, idfmode: IDFMode) -> np.ndarray:
+        """
+        Cosine norm of each query's weights, 1 for a query without weights
+        so that dividing by it is always safe.
+
+        Args:
+            `tfmode`: the term frequency mode
+            `idfmode`: the inverse document frequency mode
+
+        Returns:
+            An array with one value per query.
+        """
+        key = (tfmode, idfmode)
+        if key not in self._norms:
+            values = self.weights(tfmode, idfmode)
+            norms = np.sqrt(np.bincount(self.rows, values * values, minlength=self.shape[0]))
+            norms[norms == 0] = 1
+            self._norms[key] = norms
+        return self._norms[key]
+
+    def matrix(self, query_weighting: WeightingTriplet) -> sparse.csr_matrix:
+        """
+        Builds the query-term matrix of a query weighting.
+
+        Args:
+            `query_weighting`: term weighting method for queries
+
+        Returns:
+            A sparse matrix. Rows are queries, in order, and columns are
+            terms of the vocabulary.
+        """
+        values = self.weights(query_weighting.tf, query_weighting.idf)
+        if query_weighting.norm == NormMode.C:
+            values = values / self.norm(query_weighting.tf, query_weighting.idf)[self.rows]
+
+        found = self._found
+        indptr = np.zeros(self.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.rows[found], minlength=self.shape[0]), out=indptr[1:])
+        return sparse.csr_matrix((values[found], self.cols[found], indptr), shape=self.shape)
@@ -1,7 +1,11 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
+from base import profiling
 from base.choices import TFMode, IDFMode, NormMode
+from base.index import InvertedIndex
+from base.matrix import TermDocMatrix
+from base.stats import DocumentStats
+from scipy import sparse
 import math
-import pandas as pd
 import warnings
 
 # Suppress FutureWarning messages
@@ -11,87 +15,65 @@ warnings.simplefilter(action="ignore", category=FutureWarning)
 class Converter:
     @staticmethod
     def convert(
-        tftable: pd.DataFrame,
-        wc_table: dict,
+        tf_matrix: TermDocMatrix,
         tfmode: TFMode = TFMode.N,
         idfmode: IDFMode = IDFMode.N,
         normmode: NormMode = NormMode.N,
-    ) -> pd.DataFrame:
+        stats: Optional[DocumentStats] = None,
+    ) -> TermDocMatrix:
         """
         Convert the document statistics using the specified modes.
 
         Args:
-            tftable (pd.DataFrame): The term frequency table. Rows are documents and columns are terms.
-            wc_dict (dict): A dictionary where the keys are document IDs and the values are the word counts.
+            tf_matrix (TermDocMatrix): The term frequency matrix. Rows are documents and columns are terms.
             tfmode (TFMode): The term frequency mode.
             idfmode (IDFMode): The inverse document frequency mode.
             normmode (NormMode): The normalization mode.
+            stats (DocumentStats): Statistics of `tf_matrix` to reuse, computed if None.
 
         Returns:
-            pd.DataFrame: The converted document statistics.
+            TermDocMatrix: The converted document statistics.
         """
 
-        # Calculate the tf values
-        if tfmode == TFMode.N:
-            value_table = tftable.copy(deep=True)
-        elif tfmode == TFMode.L:
-            value_table = tftable.map(lambda x: 1 + math.log(x) if x > 0 else 0)
-        elif tfmode == TFMode.A:
-            max_tf = tftable.max(axis=1)
-            value_table = tftable.div(max_tf, axis=0).mul(0.5).add(0.5)
-
-            # Replace values with 0 where the term frequency is 0
-            value_table = value_table.where(tftable > 0, 0)
-        elif tfmode == TFMode.B:
-            value_table = tftable.map(lambda x: 1 if x > 0 else 0)
-
-        # Calculate the idf values
-        if idfmode == IDFMode.N:
-            pass
-        elif idfmode == IDFMode.T:
-            idf_table = pd.Series(
-                {term: math.log(len(tftable) / wc) for term, wc in wc_table.items()}
-            )
-            # axis = 0?
-            value_table = value_table.mul(idf_table, axis=1)
-
-        # Calculate the normalization values
-        if normmode == NormMode.N:
-            pass
-        elif normmode == NormMode.C:
-            value_table = value_table.div(
-                value_table.pow(2).sum(axis=1).pow(0.5), axis=0
+        weighting = (tfmode.name + idfmode.name + normmode.name).lower()
+        with profiling.span("convert", weighting=weighting):
+            # Weights are computed on the stored (non-zero) cells only, every
+            # per-document statistic is broadcast back through the row numbers
+            if stats is None:
+                stats = DocumentStats(tf_matrix)
+            values = stats.weights(tfmode, idfmode)
+
+            # Calculate the normalization values
+            if normmode == NormMode.N:
+                pass
+            elif normmode == NormMode.C:
+                values /= stats.norm(tfmode, idfmode)[tf_matrix.rows()]
+
+            value_matrix = sparse.csr_matrix(
+                (values, tf_matrix.matrix.indices, tf_matrix.matrix.indptr),
+                shape=tf_matrix.matrix.shape,
             )
 
-        return value_table
+            # Terms weighted to zero (i.e. idf of a term in every document) are dropped
+            if not values.all():
+                value_matrix = value_matrix.copy()
+                value_matrix.eliminate_zeros()
+
+            return tf_matrix.with_matrix(value_matrix)
 
     @staticmethod
-    def invert(value_table: pd.DataFrame) -> pd.DataFrame:
+    def invert(value_matrix: TermDocMatrix) -> InvertedIndex:
         """
         Invert the document statistics.
 
         Args:
-            value_table (pd.DataFrame): The document statistics to invert.
+            value_matrix (TermDocMatrix): The document statistics to invert.
 
         Returns:
-            pd.DataFrame: The inverted document statistics, as inverted file.
+            InvertedIndex: The inverted document statistics, as inverted file.
         """
-
-        # for each term, get the list of documents that contain it
-        # each row is a term, column 1 is the document id, column 2 is the tf-idf value
-        # term can be repeated in the first column, i.e. multiple rows with the same term but different document id, index on term
-        inverted_file = pd.DataFrame(columns=["term", "doc_id", "tfidf"])
-        for term in value_table.columns:
-            # get the documents that contain the term
-            docs = value_table[value_table[term] > 0][term]
-            # create a dataframe with the term and the document id and tfidf value
-            term_df = pd.DataFrame(
-                {"term": term, "doc_id": docs.index, "tfidf": docs.values}
-            )
-            # concatenate the dataframe to the inverted file
-            inverted_file = pd.concat([inverted_file, term_df])
-
-        return inverted_file
+        with profiling.span("invert"):
+            return InvertedIndex.from_matrix(value_matrix)
 
     @staticmethod
     def calc_term_frequency(terms: List[str], mode: TFMode) -> Dict[str, float]:
@@ -157,6 +139,6 @@ if __name__ == "__main__":
     converter = Converter()
     print(reader.tf_table)
     res = converter.convert(
-        reader.tf_table, reader.wc_table, TFMode.N, IDFMode.T, NormMode.N
+        reader.tf_matrix, TFMode.N, IDFMode.T, NormMode.N
     )
     res = converter.invert(res)
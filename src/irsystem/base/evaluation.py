@@ -0,0 +1,177 @@
+from typing import List, Sequence
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from base.relevance import BaseRelevanceReader
+
+
+RECALL_LEVELS = np.linspace(0, 1, 11)
+"""
+Recall levels of the interpolated precision-recall curve, 0.0 to 1.0 by 0.1.
+"""
+
+
+class Qrels:
+    """
+    Relevance judgments of a query set, read once and aligned to the
+    queries and to the document numbering of an index, so rankings are
+    evaluated with array operations instead of per-document lookups.
+
+    Attributes:
+        query_ids (np.ndarray): The query IDs, in row order.
+        doc_ids (np.ndarray): The document IDs, indexed by document number.
+        judged (np.ndarray): Whether each query has relevance judgments.
+        relevant_counts (np.ndarray): Number of relevant documents of each query,
+                                      judged documents missing from the index included.
+        matrix (sparse.csr_matrix): Whether each document is relevant to each query,
+                                    rows are queries and columns are document numbers.
+    """
+
+    def __init__(
+        self,
+        relevance_reader: BaseRelevanceReader,
+        query_ids: List[int],
+        doc_ids: np.ndarray,
+    ):
+        self.query_ids = np.asarray(query_ids, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        judgments = relevance_reader.convert_to_dict()
+
+        doc_numbers = {doc_id: number for number, doc_id in enumerate(self.doc_ids.tolist())}
+        rows, cols = [], []
+        self.judged = np.zeros(len(self.query_ids), dtype=bool)
+        self.relevant_counts = np.zeros(len(self.query_ids), dtype=np.int64)
+        for row, query_id in enumerate(self.query_ids.tolist()):
+            relevant = judgments.get(query_id)
+            if relevant is None:
+                continue
+            self.judged[row] = True
+            self.relevant_counts[row] = len(relevant)
+            for doc_id in relevant:
+                if doc_id in doc_numbers:
+                    rows.append(row)
+                    cols.append(doc_numbers[doc_id])
+
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, cols)),
+            shape=(len(self.query_ids), len(self.doc_ids)),
+        )
+
+    def relevance(self, doc_numbers: np.ndarray) -> np.ndarray:
+        """
+        Looks up the relevance of ranked documents.
+
+        Args:
+            `doc_numbers`: ranked document numbers, one row per query
+
+        Returns:
+            Whether each ranked document is relevant, in the shape of `doc_numbers`.
+        """
+        if doc_numbers.size == 0:
+            return np.zeros(doc_numbers.shape, dtype=bool)
+        rows = np.arange(len(self.query_ids))[:, np.newaxis]
+        return self.matrix[rows, doc_numbers].toarray()
+
+    def average_precision(self, doc_numbers: np.ndarray) -> np.ndarray:
+        """
+        Calculates the average precision of each query over its ranking.
+        Precision is summed at the rank of every relevant document retrieved,
+        and divided by the number of relevant documents of the query.
+
+        Args:
+            `doc_numbers`: ranked document numbers, one row per query, best first
+
+        Returns:
+            The average precision of each query, NaN for queries without judgments.
+        """
+        hits = self.relevance(doc_numbers)
+        ranks = np.arange(1, hits.shape[1] + 1)
+        precisions = np.cumsum(hits, axis=1) / ranks
+
+        average_precisions = np.full(len(self.query_ids), np.nan)
+        average_precisions[self.judged] = (
+            (precisions * hits).sum(axis=1)[self.judged] / self.relevant_counts[self.judged]
+        )
+        return average_precisions
+
+    def mean_average_precision(self, doc_numbers: np.ndarray) -> float:
+        """
+        Calculates the mean average precision of the judged queries.
+
+        Args:
+            `doc_numbers`: ranked document numbers, one row per query, best first
+
+        Returns:
+            The mean of the average precision of every judged query.
+        """
+        if not self.judged.any():
+            raise Exception("No query has relevance judgments.")
+        return float(self.average_precision(doc_numbers)[self.judged].mean())
+
+    def metrics(self, doc_numbers: np.ndarray, cutoffs: Sequence[int] = (5, 10, 15)) -> pd.DataFrame:
+        """
+        Calculates the trec_eval measures of every judged query from one
+        lookup of the ranking's relevance. Every measure is a cumulative sum
+        or a reduction over the same hit matrix, so all of them cost about
+        as much as one. Documents ranked past the ranking's depth count as
+        not retrieved.
+
+        - `map`: average precision
+        - `Rprec`: precision at the number of relevant documents
+        - `recip_rank`: inverse rank of the first relevant document
+        - `P_<k>`, `recall_<k>`, `ndcg_cut_<k>`: precision, recall and
+          binary-gain nDCG of the `k` best documents, for each cutoff
+        - `iprec_at_recall_<r>`: highest precision at a recall of `r` or
+          more, for each of the `RECALL_LEVELS`
+
+        Args:
+            `doc_numbers`: ranked document numbers, one row per query, best first
+            `cutoffs`: the ranks precision, recall and nDCG are measured at
+
+        Returns:
+            pd.DataFrame: One row per judged query, indexed by query ID, one column per measure.
+        """
+        judged = self.judged
+        hits = self.relevance(doc_numbers)[judged]
+        relevant_counts = self.relevant_counts[judged]
+        query_count, depth = hits.shape
+
+        ranks = np.arange(1, depth + 1)
+        retrieved_relevant = np.cumsum(hits, axis=1)
+        precisions = retrieved_relevant / ranks
+        recalls = retrieved_relevant / relevant_counts[:, np.newaxis]
+        rows = np.arange(query_count)
+
+        def at_rank(values: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+            # Value of each query at a rank of at most `depth`, 0 at rank 0
+            padded = np.hstack([np.zeros((query_count, 1)), values])
+            return padded[rows, np.minimum(ranks, depth)]
+
+        measures = {
+            "map": (precisions * hits).sum(axis=1) / relevant_counts,
+            "Rprec": at_rank(retrieved_relevant, relevant_counts) / relevant_counts,
+            "recip_rank": (hits / ranks).max(axis=1, initial=0.0),
+        }
+
+        # Discounted gain of the ranking, and of an ideal ranking of every length
+        gains = np.cumsum(hits / np.log2(ranks + 1), axis=1)
+        longest = max(cutoffs, default=0)
+        ideal_gains = np.append(0.0, np.cumsum(1 / np.log2(np.arange(2, longest + 2))))
+        for k in cutoffs:
+            measures[f"P_{k}"] = at_rank(retrieved_relevant, k) / k
+            measures[f"recall_{k}"] = at_rank(recalls, k)
+            ideal = ideal_gains[np.minimum(relevant_counts, k)]
+            measures[f"ndcg_cut_{k}"] = np.divide(
+                at_rank(gains, k), ideal, out=np.zeros(query_count), where=ideal > 0
+            )
+
+        # Interpolated precision, the best precision at or past the first
+        # rank reaching each recall level, precision never rising past it
+        best_after = np.maximum.accumulate(precisions[:, ::-1], axis=1)[:, ::-1]
+        for level in RECALL_LEVELS:
+            reached = recalls >= level - 1e-12
+            measures[f"iprec_at_recall_{level:.2f}"] = np.where(reached, best_after, 0.0).max(
+                axis=1, initial=0.0
+            )
+
+        return pd.DataFrame(measures, index=pd.Index(self.query_ids[judged], name="query_id"))
@@ -0,0 +1,275 @@
+from pathlib import Path
+from typing import Optional, Union
+import json
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from base.matrix import TermDocMatrix
+
+
+INDEX_FORMAT = 2
+"""
+Version of the on-disk index layout written by `InvertedIndex.save`.
+"""
+
+
+class InvertedIndex:
+    """
+    Inverted file of a weighted term-document matrix. The postings of every
+    term are stored back to back in shared arrays, a term's postings are the
+    slice `offsets[col]:offsets[col + 1]`.
+
+    Attributes:
+        terms (np.ndarray): The vocabulary, sorted, in column order.
+        doc_ids (np.ndarray): The document IDs, indexed by document number.
+        offsets (np.ndarray): Start of each term's postings, plus the end of the last one.
+        doc_numbers (np.ndarray): Document number of each posting, ascending within a term.
+        weights (np.ndarray): Weight of each posting.
+        doc_lengths (np.ndarray): Number of tokens of each document.
+        norms (np.ndarray): Euclidean norm of each document's weights, scaled.
+        scales (np.ndarray): Factor of each document's weights, None for 1. Cosine
+                             normalization is stored as the inverse norm of each
+                             document instead of being applied to every posting.
+
+    On disk, `save` writes one `.npy` file per attribute to a directory, all
+    of them loadable with `numpy.memmap` through `np.load(mmap_mode=...)`:
+
+        meta.json         format version, term, document and posting counts, scaled flag
+        terms.npy         <U   [terms]          sorted vocabulary
+        offsets.npy       int64 [terms + 1]     postings offsets of each term
+        doc_numbers.npy   int32 [postings]      document number of each posting
+        weights.npy       float64 [postings]    weight of each posting
+        doc_ids.npy       int64 [documents]     document ID of each document number
+        doc_lengths.npy   int64 [documents]     token count of each document
+        norms.npy         float64 [documents]   weight vector norm of each document
+        scales.npy        float64 [documents]   weight factor of each document, if scaled
+    """
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        doc_ids: np.ndarray,
+        offsets: np.ndarray,
+        doc_numbers: np.ndarray,
+        weights: np.ndarray,
+        doc_lengths: np.ndarray,
+        norms: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+    ):
+        self.terms = terms
+        self.doc_ids = doc_ids
+        self.offsets = offsets
+        self.doc_numbers = doc_numbers
+        self.weights = weights
+        self.doc_lengths = doc_lengths
+        self.scales = scales
+        self._max_weights = None
+
+        if norms is None:
+            norms = np.sqrt(
+                np.bincount(doc_numbers, weights=weights * weights, minlength=len(doc_ids))
+            )
+            if scales is not None:
+                norms *= scales
+        self.norms = norms
+
+    @staticmethod
+    def from_matrix(value_matrix: TermDocMatrix, norms: Optional[np.ndarray] = None) -> "InvertedIndex":
+        """
+        Builds the inverted index of a weighted matrix in one pass.
+
+        Args:
+            `value_matrix`: the weighted term-document matrix, terms sorted
+            `norms`: the norm of each document's weights, computed if None
+
+        Returns:
+            An `InvertedIndex` holding every non-zero weight of the matrix.
+        """
+        by_term = value_matrix.matrix.tocsc()
+        by_term.sort_indices()
+
+        return InvertedIndex(
+            np.array(value_matrix.terms, dtype=str),
+            np.asarray(value_matrix.doc_ids, dtype=np.int64),
+            by_term.indptr.astype(np.int64),
+            by_term.indices.astype(np.int32),
+            by_term.data.astype(np.float64),
+            np.asarray(value_matrix.doc_lengths, dtype=np.int64),
+            norms,
+        )
+
+    def save(self, path: Union[str, Path]):
+        """
+        Writes the index in the on-disk layout described on the class.
+
+        Args:
+            `path`: the directory to write to, created if missing
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        for name in ("terms", "offsets", "doc_numbers", "weights", "doc_ids", "doc_lengths", "norms"):
+            np.save(path / f"{name}.npy", getattr(self, name))
+        if self.scales is not None:
+            np.save(path / "scales.npy", self.scales)
+
+        meta = {
+            "format": INDEX_FORMAT,
+            "terms": len(self.terms),
+            "documents": len(self.doc_ids),
+            "postings": len(self.doc_numbers),
+            "scaled": self.scales is not None,
+        }
+        (path / "meta.json").write_text(json.dumps(meta))
+
+    @staticmethod
+    def load(path: Union[str, Path], mmap_mode: Optional[str] = "r") -> "InvertedIndex":
+        """
+        Opens an index written by `save`. By default every array is
+        memory-mapped read-only, so processes opening the same index share
+        the operating system's page cache instead of holding their own copy.
+
+        Args:
+            `path`: the directory to read from
+            `mmap_mode`: memory-map mode passed to `np.load`, None reads the arrays
+
+        Returns:
+            The opened `InvertedIndex`.
+        """
+        path = Path(path)
+
+        meta = json.loads((path / "meta.json").read_text())
+        if meta["format"] != INDEX_FORMAT:
+            raise Exception(f"Unsupported index format: {meta['format']}")
+
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in ("terms", "offsets", "doc_numbers", "weights", "doc_ids", "doc_lengths", "norms")
+        }
+        if meta["scaled"]:
+            arrays["scales"] = np.load(path / "scales.npy", mmap_mode=mmap_mode)
+        return InvertedIndex(**arrays)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, term: str) -> bool:
+        return self.column(term) is not None
+
+    def column(self, term: str) -> Optional[int]:
+        """
+        Finds the column of a term by binary search over the sorted terms.
+
+        Args:
+            `term`: the term to look up
+
+        Returns:
+            The term's column, or None if the term is not in the index.
+        """
+        col = int(np.searchsorted(self.terms, term))
+        if col < len(self.terms) and self.terms[col] == term:
+            return col
+        return None
+
+    def scaled(self, scales: np.ndarray) -> "InvertedIndex":
+        """
+        Scales the weights of each document by a factor, i.e. the inverse of
+        its cosine norm. The postings arrays are shared, not copied, the
+        factors are applied to the scores of each document instead.
+
+        Args:
+            `scales`: the factor of each document, by document number
+
+        Returns:
+            An `InvertedIndex` of the scaled weights.
+        """
+        if self.scales is not None:
+            scales = scales * self.scales
+        return InvertedIndex(
+            self.terms,
+            self.doc_ids,
+            self.offsets,
+            self.doc_numbers,
+            self.weights,
+            self.doc_lengths,
+            np.asarray(self.norms) * scales,
+            scales,
+        )
+
+    def scaled_weights(self) -> np.ndarray:
+        """
+        Returns:
+            The weight of each posting with its document's scale applied.
+        """
+        if self.scales is None:
+            return self.weights
+        return self.weights * self.scales[self.doc_numbers]
+
+    def max_weights(self) -> np.ndarray:
+        """
+        Highest scaled weight of each term's postings, 0 for a term without
+        postings. Cached after the first call.
+
+        Returns:
+            An array with one value per term.
+        """
+        if self._max_weights is None:
+            lengths = np.diff(self.offsets)
+            max_weights = np.zeros(len(self.terms), dtype=np.float64)
+            nonempty = lengths > 0
+            if nonempty.any():
+                max_weights[nonempty] = np.maximum.reduceat(
+                    self.scaled_weights(), self.offsets[:-1][nonempty]
+                )
+            self._max_weights = max_weights
+        return self._max_weights
+
+    def to_matrix(self) -> sparse.csc_matrix:
+        """
+        Views the index as a sparse weight matrix, rows are documents and
+        columns are terms. The postings arrays are shared, not copied, so
+        the weights are before `scales`.
+
+        Returns:
+            sparse.csc_matrix: The weight matrix of the indexed documents.
+        """
+        return sparse.csc_matrix(
+            (self.weights, self.doc_numbers, self.offsets),
+            shape=(len(self.doc_ids), len(self.terms)),
+            copy=False,
+        )
+
+    def to_doc_matrix(self) -> TermDocMatrix:
+        """
+        Rebuilds the weighted term-document matrix the index was built from.
+
+        Returns:
+            TermDocMatrix: The scaled weights, rows are documents in document number order.
+        """
+        matrix = sparse.csc_matrix(
+            (self.scaled_weights(), self.doc_numbers, self.offsets),
+            shape=(len(self.doc_ids), len(self.terms)),
+        )
+        return TermDocMatrix(
+            matrix.tocsr(),
+            self.terms.tolist(),
+            self.doc_ids.tolist(),
+            np.asarray(self.doc_lengths),
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Materializes the index as an inverted file table, one row per posting.
+
+        Returns:
+            pd.DataFrame: Columns are term, doc_id and tfidf. Terms are
+                          categorical, each posting holds a term ID, not a string.
+        """
+        term_ids = np.repeat(np.arange(len(self.terms), dtype=np.int32), np.diff(self.offsets))
+        return pd.DataFrame(
+            {
+                "term": pd.Categorical.from_codes(term_ids, categories=self.terms),
+                "doc_id": self.doc_ids[self.doc_numbers],
+                "tfidf": self.scaled_weights(),
+            }
+        )
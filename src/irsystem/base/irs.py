@@ -1,15 +1,27 @@
 # mac requirements:
 import os
+import sys
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
 sys.path.append(parent_dir)
 
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from scipy import sparse
 from base.relevance import BaseRelevanceReader
 from base.reader import BaseDocReader
-from base.query import BaseQueryReader
+from base.query import BaseQueryReader, Query
+from base import profiling
 from base.choices import IDFMode, NormMode, WeightingTriplet
+from base.compiler import CompiledQueries
 from base.converter import Converter
+from base.evaluation import Qrels
+from base.index import InvertedIndex
+from base.ranking import Ranking
+from base.stats import DocumentStats
+from base.scorer import Scorer
 
 
 class IRS:
@@ -22,16 +34,255 @@ class IRS:
     doc_reader: BaseDocReader
     query_reader: BaseQueryReader
     relevance_reader: BaseRelevanceReader
+    scorer: Optional[Scorer]
 
     def __init__(
         self,
         doc_reader: BaseDocReader,
         query_reader: BaseQueryReader,
-        relevance_reader: BaseRelevanceReader
+        relevance_reader: BaseRelevanceReader,
+        scorer: Optional[Scorer] = None,
     ):
         self.doc_reader = doc_reader
         self.query_reader = query_reader
         self.relevance_reader = relevance_reader
+        # scores queries against the index, picked per batch by Scorer.choose
+        # if None. MaxScoreScorer is only used when set here
+        self.scorer = scorer
+
+        # weighted documents and queries, keyed by weighting triplet string
+        self._doc_weights: Dict[str, InvertedIndex] = {}
+        self._query_weights: Dict[str, Tuple[List[Query], sparse.csr_matrix]] = {}
+        self._doc_stats: Optional[DocumentStats] = None
+        self._compiled_queries: Optional[CompiledQueries] = None
+        self._qrels: Optional[Qrels] = None
+
+    def doc_stats(self) -> DocumentStats:
+        """
+        Per-document statistics shared by every document weighting, computed
+        once per collection.
+
+        Returns:
+            The `DocumentStats` of the document term frequencies.
+        """
+        if self._doc_stats is None:
+            self._doc_stats = DocumentStats(self.doc_reader.tf_matrix)
+        return self._doc_stats
+
+    def compiled_queries(self) -> CompiledQueries:
+        """
+        Query tokens mapped to the document vocabulary, shared by every
+        query weighting, computed once per collection.
+
+        Returns:
+            The `CompiledQueries` of the query set.
+        """
+        if self._compiled_queries is None:
+            tf_matrix = self.doc_reader.tf_matrix
+            self._compiled_queries = CompiledQueries(
+                [query["tokens"] for query in self.query_reader.queries],
+                tf_matrix.lexicon,
+                tf_matrix.idfs(),
+            )
+        return self._compiled_queries
+
+    def qrels(self) -> Qrels:
+        """
+        Relevance judgments of the queries, aligned to the document order of
+        the collection. Read once, later calls return the cached judgments.
+
+        Returns:
+            The `Qrels` of the query set.
+        """
+        if self._qrels is None:
+            self._qrels = Qrels(
+                self.relevance_reader,
+                [query["query_id"] for query in self.query_reader.queries],
+                self.doc_reader.tf_matrix.doc_ids,
+            )
+        return self._qrels
+
+    def weight_documents(self, doc_weighting: WeightingTriplet) -> InvertedIndex:
+        """
+        Weights the documents and inverts them. Computed once per weighting
+        method, later calls return the cached index. A cosine normalized
+        index shares the postings of the unnormalized one, scaled by the
+        inverse norm of each document.
+
+        Args:
+            `doc_weighting`: term weighting method for documents
+
+        Returns:
+            The inverted index of the weighted documents.
+        """
+        key = doc_weighting.to_str()
+        if key not in self._doc_weights and doc_weighting.norm == NormMode.C:
+            unnormalized = self.weight_documents(
+                WeightingTriplet(doc_weighting.tf, doc_weighting.idf, NormMode.N)
+            )
+            with profiling.span("normalize", weighting=key):
+                norms = self.doc_stats().norm(doc_weighting.tf, doc_weighting.idf)
+                self._doc_weights[key] = unnormalized.scaled(1 / norms)
+        elif key not in self._doc_weights:
+            # calculate tf-idf of documents
+            term_weight = Converter.convert(
+                self.doc_reader.tf_matrix,
+                doc_weighting.tf,
+                doc_weighting.idf,
+                doc_weighting.norm,
+                self.doc_stats(),
+            )
+            self._doc_weights[key] = Converter.invert(term_weight)
+
+        return self._doc_weights[key]
+
+    def open_index(self, doc_weighting: WeightingTriplet, path: str) -> InvertedIndex:
+        """
+        Opens a weighted index saved with `InvertedIndex.save`, memory-mapped,
+        and uses it for the weighting method instead of computing it. The
+        index must hold the terms and documents of the collection, in the
+        same order.
+
+        Once `add_documents` or `remove_documents` changes the collection,
+        an opened index without idf or normalization is rebuilt in memory
+        and is no longer memory-mapped. Other opened indexes are dropped and
+        recomputed from the collection.
+
+        Args:
+            `doc_weighting`: term weighting method the index was built with
+            `path`: the index directory
+
+        Returns:
+            The opened inverted index.
+        """
+        inverted_index = InvertedIndex.load(path)
+
+        # Query vectors are built on the collection's columns
+        tf_matrix = self.doc_reader.tf_matrix
+        if inverted_index.terms.tolist() != tf_matrix.terms:
+            raise Exception(f"Index terms don't match the collection: {path}")
+        if inverted_index.doc_ids.tolist() != list(tf_matrix.doc_ids):
+            raise Exception(f"Index documents don't match the collection: {path}")
+
+        self._doc_weights[doc_weighting.to_str()] = inverted_index
+        return inverted_index
+
+    def add_documents(self, docs: List[dict]):
+        """
+        Adds documents to the collection. Cached unnormalized indexes of
+        weightings without idf are extended with the weights of the new
+        documents alone. Weights that depend on idf or on the document
+        statistics, and the weighted queries, are recomputed the next time
+        they are used.
+
+        Args:
+            `docs`: documents in the format of the document reader's `get_docs`
+        """
+        added = self.doc_reader.add_documents(docs)
+        self._doc_stats = None
+        self._compiled_queries = None
+        self._qrels = None
+
+        for key, inverted_index in list(self._doc_weights.items()):
+            doc_weighting = WeightingTriplet.from_str(key)
+            if doc_weighting.idf != IDFMode.N or doc_weighting.norm != NormMode.N:
+                del self._doc_weights[key]
+                continue
+
+            term_weight = Converter.convert(
+                added, doc_weighting.tf, doc_weighting.idf, doc_weighting.norm
+            )
+            norms = np.sqrt(term_weight.row_reduce(np.add, term_weight.matrix.data ** 2))
+            self._doc_weights[key] = InvertedIndex.from_matrix(
+                inverted_index.to_doc_matrix().append(term_weight),
+                np.concatenate([inverted_index.norms, norms]),
+            )
+
+        self._query_weights.clear()
+
+    def remove_documents(self, doc_ids: List[int]):
+        """
+        Removes documents from the collection. Cached unnormalized indexes
+        of weightings without idf drop their postings. Weights that depend
+        on idf or on the document statistics, and the weighted queries, are
+        recomputed the next time they are used.
+
+        Args:
+            `doc_ids`: IDs of the documents to remove
+        """
+        self.doc_reader.remove_documents(doc_ids)
+        self._doc_stats = None
+        self._compiled_queries = None
+        self._qrels = None
+        removed = set(doc_ids)
+
+        for key, inverted_index in list(self._doc_weights.items()):
+            doc_weighting = WeightingTriplet.from_str(key)
+            if doc_weighting.idf != IDFMode.N or doc_weighting.norm != NormMode.N:
+                del self._doc_weights[key]
+                continue
+
+            kept = np.array([doc_id not in removed for doc_id in inverted_index.doc_ids.tolist()])
+            self._doc_weights[key] = InvertedIndex.from_matrix(
+                inverted_index.to_doc_matrix().drop(doc_ids),
+                np.asarray(inverted_index.norms)[kept],
+            )
+
+        self._query_weights.clear()
+
+    def weight_queries(self, query_weighting: WeightingTriplet) -> Tuple[List[Query], sparse.csr_matrix]:
+        """
+        Weights the queries from their compiled cells, see
+        `compiled_queries`. Computed once per weighting method, later calls
+        return the cached queries.
+
+        Args:
+            `query_weighting`: term weighting method for queries
+
+        Returns:
+            The weighted queries and their query-term matrix, aligned to
+            the document vocabulary.
+        """
+        key = query_weighting.to_str()
+        if key in self._query_weights:
+            return self._query_weights[key]
+
+        with profiling.span("weight_queries", weighting=key):
+            queries = self.query_reader.to_query_list()
+            query_matrix = self.compiled_queries().matrix(query_weighting)
+        self._query_weights[key] = (queries, query_matrix)
+
+        return self._query_weights[key]
+
+    def rank(self, doc_weighting: WeightingTriplet, query_weighting: WeightingTriplet, rank_limit: int = 15) -> Ranking:
+        """
+        Retrieves the top ranked documents of every query, and keeps them on
+        each query, see `Query.similarities`.
+
+        Args:
+            `doc_weighting`: term weighting method for documents
+            `query_weighting`: term weighting method for queries
+            `rank_limit`: number of retrieved documents per query
+
+        Returns:
+            The `Ranking` of the queries, in query reader order.
+        """
+        inverted_index = self.weight_documents(doc_weighting)
+        queries, query_matrix = self.weight_queries(query_weighting)
+
+        # here we already have inverted files of queries and documents
+        # we can now calculate the similarity for each query
+
+        # keep only the top ranked documents of each query, best first
+        scorer = self.scorer or Scorer.choose(query_matrix, inverted_index)
+        postings_visited = scorer.postings_visited
+        with profiling.span("score", scorer=type(scorer).__name__, rank_limit=rank_limit):
+            ranking = scorer.top_k(query_matrix, inverted_index, rank_limit)
+            profiling.count("postings", scorer.postings_visited - postings_visited)
+        for query, doc_ids, query_scores in zip(queries, ranking.doc_ids, ranking.scores):
+            query.ranked_doc_ids, query.ranked_scores = doc_ids, query_scores
+
+        return ranking
 
     def eval(self, doc_weighting: WeightingTriplet, query_weighting: WeightingTriplet, rank_limit: int = 15):
         """
@@ -42,91 +293,78 @@ class IRS:
             `doc_weighting`: term weighting method for documents
             `query_weighting` term weighting method for queries
         """
+        ranking = self.rank(doc_weighting, query_weighting, rank_limit)
 
-        # calculate tf-idf-normalized of documents
-        term_weight = Converter.convert(
-            self.doc_reader.tf_table,
-            self.doc_reader.wc_table,
-            doc_weighting.tf,
-            doc_weighting.idf,
-            doc_weighting.norm
-        )
-        term_weight = Converter.invert(term_weight)
-        # term_weight is in df of format: term | doc_id | weight
-
-        term_idfs = self.doc_reader.get_term_idfs()
-        queries = self.query_reader.to_query_list()
-
-        # calculate tfs of queries
-        for query in queries:
-            query.term_freqs = Converter.calc_term_frequency(
-                query.tokens, query_weighting.tf
-            )
-            query.term_weights = query.term_freqs
-
-        # calculate idfs of queries
-        if query_weighting.idf == IDFMode.T:
-            for query in queries:
-                query.term_weights = dict(
-                    (term, tf * term_idfs.get(term, 0))
-                    for (term, tf)
-                    in query.term_weights.items()
-                )
+        # calculate the MAP over the judged queries
+        with profiling.span("map"):
+            return self.qrels().mean_average_precision(ranking.doc_numbers)
 
-        # normalize the query idfs
-        if query_weighting.norm == NormMode.C:
-            for query in queries:
-                query.term_weights = Converter.normalize(
-                    query.term_weights)
-            # term_weights is in dict of format: term | weight
+    def evaluate(
+        self,
+        doc_weighting: WeightingTriplet,
+        query_weighting: WeightingTriplet,
+        rank_limit: int = 15,
+        cutoffs: Sequence[int] = (5, 10, 15),
+    ) -> pd.DataFrame:
+        """
+        Evaluates every trec_eval measure of `Qrels.metrics` for each judged
+        query, from a single ranking.
 
-        # here we already have inverted files of queries and documents
-        # we can now calculate the similarity for each query
+        Args:
+            `doc_weighting`: term weighting method for documents
+            `query_weighting`: term weighting method for queries
+            `rank_limit`: number of retrieved documents per query
+            `cutoffs`: the ranks precision, recall and nDCG are measured at
 
-        # first, create a nested dictionary from the term_weight DataFrame for fast lookups
-        term_weight_dict = {}
-        for idx, row in term_weight.iterrows():
-            term = row['term']
-            doc_id = row['doc_id']
-            tfidf = row['tfidf']
-            if term not in term_weight_dict:
-                term_weight_dict[term] = {}
-            term_weight_dict[term][doc_id] = tfidf
-
-        # iterate through queries
-        for query in queries:
-            # initialize similarities dictionary
-            query.similarities = {doc['doc_id']
-                : 0 for doc in self.doc_reader.docs}
-
-            # iterate through all terms in the query
-            for term, weight in query.term_weights.items():
-                if term in term_weight_dict:
-                    # iterate through documents that have the term
-                    for doc_id, tfidf in term_weight_dict[term].items():
-                        if doc_id in query.similarities:
-                            # calculate the similarity
-                            query.similarities[doc_id] += weight * tfidf
-        
-        # sort by similarities
-        for query in queries:
-            query.similarities = dict(sorted(query.similarities.items(), key=lambda item: item[1], reverse=True))
-        
-        # calculate the MAP for each query
-        sum = 0
-        for query in queries:
-            relevance_docs = self.relevance_reader.convert_to_dict()[query.id]
-            retrieved_docs = list(query.similarities.keys())[:rank_limit]
-            retrieved_relevance = 0
-            map = 0
-            for docs_id in retrieved_docs:
-                if (docs_id in relevance_docs):
-                    retrieved_relevance += 1
-                    map += retrieved_relevance / (retrieved_docs.index(docs_id) + 1)
-            map /= len(relevance_docs)
-            sum += map
-        average_map = sum/len(queries)
-        return average_map
+        Returns:
+            pd.DataFrame: One row per judged query, indexed by query ID, one
+                          column per measure. `.mean()` gives the aggregate.
+        """
+        ranking = self.rank(doc_weighting, query_weighting, rank_limit)
+        with profiling.span("metrics"):
+            return self.qrels().metrics(ranking.doc_numbers, cutoffs)
+
+    def sweep(
+        self,
+        doc_triplets: List[Union[str, WeightingTriplet]],
+        query_triplets: List[Union[str, WeightingTriplet]],
+        rank_limit: int = 15,
+    ) -> pd.DataFrame:
+        """
+        Evaluates the system MAP for every pair of document and query
+        weighting methods. Each weighting is computed once and reused
+        across all pairs.
+
+        Args:
+            `doc_triplets`: term weighting methods for documents
+            `query_triplets`: term weighting methods for queries
+            `rank_limit`: number of retrieved documents per query
+
+        Returns:
+            pd.DataFrame: One row per pair, document weighting major, with
+                          the `doc.query` pair and its `map`.
+        """
+        doc_weightings = [
+            WeightingTriplet.from_str(triplet) if isinstance(triplet, str) else triplet
+            for triplet in doc_triplets
+        ]
+        query_weightings = [
+            WeightingTriplet.from_str(triplet) if isinstance(triplet, str) else triplet
+            for triplet in query_triplets
+        ]
+
+        results = []
+        for doc_weighting in doc_weightings:
+            for query_weighting in query_weightings:
+                map_score = self.eval(doc_weighting, query_weighting, rank_limit)
+                results.append(
+                    {
+                        "doc.query": f"{doc_weighting.to_str()}.{query_weighting.to_str()}",
+                        "map": map_score,
+                    }
+                )
+
+        return pd.DataFrame(results, columns=["doc.query", "map"])
 
 if __name__ == '__main__':
     # CHANGE IMPORT
@@ -135,7 +373,6 @@ if __name__ == '__main__':
     from med.relevance import MedRelevanceReader
     import os
     import itertools
-    import csv
 
     # CHANGE PATH
     doc_path = "med/data/med.all"
@@ -175,19 +412,7 @@ if __name__ == '__main__':
     )
 
     # CHANGE FILE NAME
-    with open('./med/med_stem.csv', mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['doc.query', 'map'])
-        
-        count = 0
-        for doc_combination in combinations:
-            for query_combination in combinations:
-                doc_weighting = WeightingTriplet.from_str(doc_combination)
-                query_weighting = WeightingTriplet.from_str(query_combination)
-                map_score = irs.eval(doc_weighting, query_weighting)
-                writer.writerow([f"{doc_combination}.{query_combination}", map_score])
-                count += 1
-                print(f"{count}/256")
+    results = irs.sweep(combinations, combinations)
+    results.to_csv('./med/med_stem.csv', index=False, lineterminator='\r\n')
 
     print("CSV file created succesfully.")
-
@@ -0,0 +1,80 @@
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+
+class Lexicon:
+    """
+    Interns terms to dense integer IDs, numbered in order of first
+    appearance. Tokens, matrix columns, postings and query vectors hold
+    these IDs as `int32`; the strings are kept once, here, and only looked
+    up where terms enter or leave the system.
+
+    Attributes:
+        terms (list): The terms, indexed by ID.
+        ids (dict): A dictionary mapping each term to its ID.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self.terms: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for term in terms:
+            self.intern(term)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.ids
+
+    def intern(self, term: str) -> int:
+        """
+        Finds the ID of a term, numbering it first if it is new.
+
+        Args:
+            `term`: the term
+
+        Returns:
+            The ID of the term.
+        """
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def intern_tokens(self, tokens: Iterable[str], count: int = -1) -> np.ndarray:
+        """
+        Interns a sequence of tokens, see `intern`.
+
+        Args:
+            `tokens`: the tokens
+            `count`: the number of tokens, if known, to allocate the array once
+
+        Returns:
+            The ID of each token, as an `int32` array.
+        """
+        return np.fromiter((self.intern(token) for token in tokens), dtype=np.int32, count=count)
+
+    def lookup(self, terms: Iterable[str]) -> np.ndarray:
+        """
+        Finds the IDs of terms without numbering new ones.
+
+        Args:
+            `terms`: the terms
+
+        Returns:
+            The ID of each term, -1 for terms not in the lexicon, as an `int32` array.
+        """
+        return np.fromiter((self.ids.get(term, -1) for term in terms), dtype=np.int32)
+
+    def sorted(self) -> Tuple["Lexicon", np.ndarray]:
+        """
+        Renumbers the terms in term order, the order of matrix columns.
+
+        Returns:
+            The sorted `Lexicon`, and the new ID of every old ID.
+        """
+        order = sorted(range(len(self.terms)), key=self.terms.__getitem__)
+        renumbered = np.empty(len(order), dtype=np.int32)
+        renumbered[order] = np.arange(len(order), dtype=np.int32)
+        return Lexicon(self.terms[term_id] for term_id in order), renumbered
@@ -0,0 +1,316 @@
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import copy
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from base.lexicon import Lexicon
+
+
+class TermDocMatrix:
+    """
+    Sparse term-document matrix. Rows are documents and columns are terms,
+    only non-zero cells are stored (CSR layout).
+
+    Attributes:
+        matrix (sparse.csr_matrix): The sparse values, shape (documents, terms).
+        lexicon (Lexicon): The vocabulary, sorted, the ID of each term is its column.
+        doc_ids (list): The document IDs, in row order.
+        doc_index (dict): A dictionary mapping each document ID to its row.
+        doc_lengths (np.ndarray): The number of tokens of each document, in row order.
+    """
+
+    def __init__(
+        self,
+        matrix: sparse.csr_matrix,
+        terms: Union[List[str], Lexicon],
+        doc_ids: List[int],
+        doc_lengths: Optional[np.ndarray] = None,
+    ):
+        self.matrix = matrix
+        self.lexicon = terms if isinstance(terms, Lexicon) else Lexicon(terms)
+        self.doc_ids = doc_ids
+        self.doc_index = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+
+        # Row sums of a term frequency matrix are the document lengths
+        if doc_lengths is None:
+            doc_lengths = np.asarray(matrix.sum(axis=1), dtype=np.int64).ravel()
+        self.doc_lengths = doc_lengths
+
+        self._clear_stats()
+
+    @property
+    def terms(self) -> List[str]:
+        """
+        The vocabulary, in column order.
+        """
+        return self.lexicon.terms
+
+    @property
+    def vocabulary(self) -> Dict[str, int]:
+        """
+        A dictionary mapping each term to its column.
+        """
+        return self.lexicon.ids
+
+    def _clear_stats(self):
+        self._document_frequencies = None
+        self._idfs = None
+        self._rows = None
+
+    @staticmethod
+    def from_token_stream(docs: Iterable[Tuple[int, List[str]]]) -> "TermDocMatrix":
+        """
+        Builds a term frequency matrix from tokenized documents as they are
+        produced, keeping only the counts of each document, never its tokens.
+
+        Args:
+            `docs`: (document ID, tokens) pairs, consumed once
+
+        Returns:
+            A `TermDocMatrix` holding the raw term frequencies.
+        """
+        lexicon = Lexicon()
+        doc_ids, lengths, indptr = [], [], [0]
+        indices, data = array("i"), array("i")
+
+        for doc_id, tokens in docs:
+            for term, count in Counter(tokens).items():
+                indices.append(lexicon.intern(term))
+                data.append(count)
+            doc_ids.append(doc_id)
+            lengths.append(len(tokens))
+            indptr.append(len(indices))
+
+        # Columns are numbered in order of appearance, renumber them in term order
+        lexicon, columns = lexicon.sorted()
+
+        matrix = sparse.csr_matrix(
+            (
+                np.frombuffer(data, dtype=np.intc).astype(np.int32),
+                columns[np.frombuffer(indices, dtype=np.intc)],
+                np.array(indptr, dtype=np.int64),
+            ),
+            shape=(len(doc_ids), len(lexicon)),
+        )
+        matrix.sort_indices()
+
+        return TermDocMatrix(matrix, lexicon, doc_ids, np.array(lengths, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def with_matrix(self, matrix: sparse.csr_matrix) -> "TermDocMatrix":
+        """
+        Creates a matrix over the same documents and terms holding other
+        values, i.e. weights. Lookups and document lengths are shared with
+        this matrix.
+
+        Args:
+            `matrix`: the new values, same shape as this matrix
+
+        Returns:
+            A new `TermDocMatrix`.
+        """
+        other = copy.copy(self)
+        other.matrix = matrix
+        other._clear_stats()
+        return other
+
+    def append(self, other: "TermDocMatrix") -> "TermDocMatrix":
+        """
+        Creates a matrix holding the documents of this matrix followed by
+        those of another. The vocabularies are merged, in term order, and a
+        cached document frequency count is updated rather than recounted.
+
+        Args:
+            `other`: the documents to append, none of them in this matrix
+
+        Returns:
+            A new `TermDocMatrix`.
+        """
+        lexicon = Lexicon(sorted(set(self.terms).union(other.terms)))
+        columns = [lexicon.lookup(part.terms) for part in (self, other)]
+
+        # Both vocabularies are sorted, so renumbered columns stay in order
+        matrix = sparse.vstack(
+            [
+                sparse.csr_matrix(
+                    (part.matrix.data, part_columns[part.matrix.indices], part.matrix.indptr),
+                    shape=(len(part), len(lexicon)),
+                )
+                for part, part_columns in zip((self, other), columns)
+            ],
+            format="csr",
+        )
+
+        appended = TermDocMatrix(
+            matrix,
+            lexicon,
+            list(self.doc_ids) + list(other.doc_ids),
+            np.concatenate([self.doc_lengths, other.doc_lengths]),
+        )
+
+        if self._document_frequencies is not None:
+            document_frequencies = np.zeros(len(lexicon), dtype=np.int64)
+            document_frequencies[columns[0]] += self._document_frequencies
+            document_frequencies[columns[1]] += other.document_frequencies()
+            appended._document_frequencies = document_frequencies
+
+        return appended
+
+    def drop(self, doc_ids: Iterable[int]) -> "TermDocMatrix":
+        """
+        Creates a matrix without some documents. Terms no remaining document
+        holds are dropped from the vocabulary, and a cached document
+        frequency count is updated rather than recounted.
+
+        Args:
+            `doc_ids`: IDs of the documents to drop, all of them in this matrix,
+                       an ID listed twice is dropped once
+
+        Returns:
+            A new `TermDocMatrix`.
+        """
+        # Dropping a document twice would subtract its terms twice from the frequencies
+        dropped = np.array(
+            [self.doc_index[doc_id] for doc_id in dict.fromkeys(doc_ids)], dtype=np.int64
+        )
+        kept = np.ones(len(self), dtype=bool)
+        kept[dropped] = False
+
+        document_frequencies = self.document_frequencies() - np.bincount(
+            self.matrix[dropped].indices, minlength=len(self.terms)
+        )
+        kept_columns = np.flatnonzero(document_frequencies)
+
+        remaining = TermDocMatrix(
+            self.matrix[kept][:, kept_columns],
+            [self.terms[col] for col in kept_columns],
+            [doc_id for doc_id, keep in zip(self.doc_ids, kept) if keep],
+            np.asarray(self.doc_lengths)[kept],
+        )
+        remaining._document_frequencies = document_frequencies[kept_columns]
+
+        return remaining
+
+    def document_frequencies(self) -> np.ndarray:
+        """
+        Counts the documents containing each term. Cached after the first call.
+
+        Returns:
+            An array of document frequencies, in column order.
+        """
+        if self._document_frequencies is None:
+            self._document_frequencies = np.bincount(
+                self.matrix.indices, minlength=len(self.terms)
+            )
+        return self._document_frequencies
+
+    def idfs(self) -> np.ndarray:
+        """
+        Inverse document frequency of each term, `log(N / df)`. Cached after
+        the first call.
+
+        Returns:
+            An array of idf values, in column order.
+        """
+        if self._idfs is None:
+            self._idfs = np.log(len(self) / self.document_frequencies())
+        return self._idfs
+
+    def rows(self) -> np.ndarray:
+        """
+        Row number of each stored value, aligned with `matrix.data`. Cached
+        after the first call.
+
+        Returns:
+            An array of row numbers.
+        """
+        if self._rows is None:
+            self._rows = np.repeat(
+                np.arange(len(self), dtype=np.int32), np.diff(self.matrix.indptr)
+            )
+        return self._rows
+
+    def row_reduce(self, ufunc: np.ufunc, values: np.ndarray) -> np.ndarray:
+        """
+        Reduces stored values row by row, i.e. `np.maximum` for the highest
+        value of each document. Empty rows reduce to 0.
+
+        Args:
+            `ufunc`: the reducing ufunc
+            `values`: values aligned with `matrix.data`
+
+        Returns:
+            An array with one reduced value per row.
+        """
+        indptr = self.matrix.indptr
+        result = np.zeros(len(self), dtype=values.dtype)
+        non_empty = indptr[:-1] < indptr[1:]
+        if non_empty.any():
+            result[non_empty] = ufunc.reduceat(values, indptr[:-1][non_empty])
+        return result
+
+    def save(self, path: Union[str, Path]):
+        """
+        Saves the matrix as a directory of `.npy` arrays, one per component,
+        so it can be loaded back memory-mapped.
+
+        Args:
+            `path`: the directory to write to, created if missing
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        np.save(path / "data.npy", self.matrix.data)
+        np.save(path / "indices.npy", self.matrix.indices)
+        np.save(path / "indptr.npy", self.matrix.indptr)
+        np.save(path / "terms.npy", np.array(self.terms, dtype=str))
+        np.save(path / "doc_ids.npy", np.array(self.doc_ids, dtype=np.int64))
+        np.save(path / "doc_lengths.npy", self.doc_lengths)
+
+    @staticmethod
+    def load(path: Union[str, Path], mmap_mode: Optional[str] = None) -> "TermDocMatrix":
+        """
+        Loads a matrix written by `save`.
+
+        Args:
+            `path`: the directory to read from
+            `mmap_mode`: memory-map the value arrays instead of reading them,
+                         i.e. `r` to share one read-only copy between processes
+
+        Returns:
+            The loaded `TermDocMatrix`.
+        """
+        path = Path(path)
+
+        terms = np.load(path / "terms.npy").tolist()
+        doc_ids = np.load(path / "doc_ids.npy").tolist()
+        matrix = sparse.csr_matrix(
+            (
+                np.load(path / "data.npy", mmap_mode=mmap_mode),
+                np.load(path / "indices.npy", mmap_mode=mmap_mode),
+                np.load(path / "indptr.npy", mmap_mode=mmap_mode),
+            ),
+            shape=(len(doc_ids), len(terms)),
+            copy=False,
+        )
+
+        return TermDocMatrix(
+            matrix, terms, doc_ids, np.load(path / "doc_lengths.npy", mmap_mode=mmap_mode)
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Materializes the matrix as a dense DataFrame. Only meant for
+        inspection, the dense table is mostly zeros on larger collections.
+
+        Returns:
+            pd.DataFrame: Rows are documents and columns are terms.
+        """
+        return pd.DataFrame(
+            self.matrix.toarray(), index=self.doc_ids, columns=self.terms
+        )
@@ -0,0 +1,267 @@
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+import json
+import os
+import threading
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Span:
+    """
+    A timed stage of a profiled run.
+    """
+
+    name: str
+    """
+    The stage name, i.e. `convert`.
+    """
+    start: float
+    """
+    Wall clock start, in seconds since the profiler started.
+    """
+    wall: float = 0.0
+    """
+    Wall time of the stage, in seconds.
+    """
+    cpu: float = 0.0
+    """
+    CPU time of the process during the stage, in seconds.
+    """
+    memory_peak: Optional[int] = None
+    """
+    Peak traced memory allocated during the stage, in bytes, None unless
+    the profiler traces memory.
+    """
+    depth: int = 0
+    """
+    Number of spans open around this one.
+    """
+    args: Dict[str, Any] = field(default_factory=dict)
+    """
+    Details of the stage, i.e. the weighting, and the counters incremented
+    while it was the innermost open span.
+    """
+
+
+class Profiler:
+    """
+    Records spans and counters of the stages run while it is active. Stages
+    of `BaseDocReader`, `Converter` and `IRS` open spans through the module
+    level `span` and `count`, which cost a global lookup when no profiler
+    is active.
+
+        profiler = Profiler()
+        with profiler:
+            irs.eval(doc_weighting, query_weighting)
+        print(profiler.report())
+        profiler.save_chrome_trace("trace.json")
+
+    Attributes:
+        trace_memory (bool): Whether the peak memory of each span is traced
+                             with `tracemalloc`, which slows allocations down.
+        spans (list): The closed spans, in closing order.
+        counters (dict): Total of each counter.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.spans: List[Span] = []
+        self.counters: Dict[str, int] = {}
+        self._open: List[Span] = []
+        self._origin = time.perf_counter()
+        self._started_tracing = False
+        self._previous: Optional["Profiler"] = None
+
+    def __enter__(self) -> "Profiler":
+        global _active
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+
+        _active = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[Span]:
+        """
+        Times the enclosed block as a stage.
+
+        Args:
+            `name`: the stage name
+            `args`: details of the stage, kept on the span
+
+        Yields:
+            `Span`: The open span.
+        """
+        opened = Span(name, time.perf_counter() - self._origin, depth=len(self._open), args=args)
+        if self.trace_memory:
+            self._update_peaks()
+            memory_start = opened.memory_peak = tracemalloc.get_traced_memory()[0]
+
+        self._open.append(opened)
+        cpu_start = time.process_time()
+        try:
+            yield opened
+        finally:
+            opened.cpu = time.process_time() - cpu_start
+            opened.wall = time.perf_counter() - self._origin - opened.start
+            if self.trace_memory:
+                self._update_peaks()
+                opened.memory_peak -= memory_start
+            self._open.pop()
+            self.spans.append(opened)
+
+    def _update_peaks(self):
+        # The traced peak is reset whenever a span opens or closes, every
+        # open span keeps the highest peak seen since it opened
+        peak = tracemalloc.get_traced_memory()[1]
+        for open_span in self._open:
+            open_span.memory_peak = max(open_span.memory_peak, peak)
+        tracemalloc.reset_peak()
+
+    def count(self, name: str, value: int = 1):
+        """
+        Adds to a counter, and to the same counter of the innermost open span.
+
+        Args:
+            `name`: the counter name, i.e. `postings`
+            `value`: the amount to add
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+        if self._open:
+            args = self._open[-1].args
+            args[name] = args.get(name, 0) + value
+
+    def report(self) -> pd.DataFrame:
+        """
+        Sums the spans of each stage.
+
+        Returns:
+            pd.DataFrame: One row per stage name, in order of first use, with
+                          its calls, wall and CPU seconds, highest memory peak
+                          and the counters incremented directly inside it.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for closed in sorted(self.spans, key=lambda closed: closed.start):
+            row = rows.setdefault(
+                closed.name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "memory_peak": None}
+            )
+            row["calls"] += 1
+            row["wall_seconds"] += closed.wall
+            row["cpu_seconds"] += closed.cpu
+            if closed.memory_peak is not None:
+                row["memory_peak"] = max(row["memory_peak"] or 0, closed.memory_peak)
+            for counter in self.counters:
+                if counter in closed.args:
+                    row[counter] = row.get(counter, 0) + closed.args[counter]
+
+        report = pd.DataFrame.from_dict(rows, orient="index").rename_axis("stage")
+        counters = [counter for counter in self.counters if counter in report]
+        report[counters] = report[counters].fillna(0).astype(np.int64)
+        return report
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Converts the spans to the Chrome trace event format, readable by
+        `chrome://tracing` and Perfetto.
+
+        Returns:
+            A JSON-serializable trace, one complete event per span and the
+            counter totals as counter events.
+        """
+        pid, tid = os.getpid(), threading.get_ident()
+        events = []
+        for closed in self.spans:
+            args = dict(closed.args, cpu_ms=closed.cpu * 1000)
+            if closed.memory_peak is not None:
+                args["memory_peak_bytes"] = closed.memory_peak
+            events.append(
+                {
+                    "name": closed.name,
+                    "ph": "X",
+                    "ts": closed.start * 1e6,
+                    "dur": closed.wall * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {key: _json_value(value) for key, value in args.items()},
+                }
+            )
+
+        end = max((closed.start + closed.wall for closed in self.spans), default=0.0)
+        for name, value in self.counters.items():
+            events.append({"name": name, "ph": "C", "ts": end * 1e6, "pid": pid, "args": {name: value}})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: Union[str, Path]):
+        """
+        Writes the Chrome trace of `to_chrome_trace` as JSON.
+
+        Args:
+            `path`: the trace file
+        """
+        Path(path).write_text(json.dumps(self.to_chrome_trace()))
+
+
+def _json_value(value: Any) -> Any:
+    # Span details may be enums or NumPy scalars
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+_active: Optional[Profiler] = None
+_DISABLED = nullcontext()
+
+
+def enabled() -> bool:
+    """
+    Returns:
+        Whether a profiler is active, so costly counters are worth computing.
+    """
+    return _active is not None
+
+
+def span(name: str, **args):
+    """
+    Times the enclosed block as a stage of the active profiler, does nothing
+    when none is active.
+
+    Args:
+        `name`: the stage name
+        `args`: details of the stage
+
+    Returns:
+        A context manager.
+    """
+    if _active is None:
+        return _DISABLED
+    return _active.span(name, **args)
+
+
+def count(name: str, value: int = 1):
+    """
+    Adds to a counter of the active profiler, does nothing when none is active.
+
+    Args:
+        `name`: the counter name
+        `value`: the amount to add
+    """
+    if _active is not None:
+        _active.count(name, value)
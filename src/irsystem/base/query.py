@@ -1,21 +1,34 @@
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+import numpy as np
+from base.cache import ParseCache
+from base.choices import TokenizerMode
 from base.parser import BaseParser
 
 
-@dataclass
+@dataclass(slots=True)
 class Query:
     """
     `Query` contains all information regarding a query, including
-    the query statement, tokens, term frequencies, and term weights.
+    the query statement, tokens, and its top ranked documents once ranked.
+    Only the retrieved documents are kept, as rows of the `Ranking`
+    they were retrieved in, not a score per document.
     """
 
     id: int
     content: str
     tokens: List[str]
-    term_freqs: Dict[str, float]
-    term_weights: Dict[str, float]
-    similarities: Dict[int, float]
+    ranked_doc_ids: Optional[np.ndarray] = None
+    ranked_scores: Optional[np.ndarray] = None
+
+    @property
+    def similarities(self) -> Dict[int, float]:
+        """
+        The retrieved document IDs mapped to their similarity, best first.
+        """
+        if self.ranked_doc_ids is None:
+            return {}
+        return dict(zip(self.ranked_doc_ids.tolist(), self.ranked_scores.tolist()))
 
     @staticmethod
     def from_raw(raw_query: Dict[str, Any]) -> "Query":
@@ -34,9 +47,6 @@ class Query:
             raw_query["query_id"],
             raw_query["query"],
             raw_query["tokens"],
-            {},
-            {},
-            {}
         )
 
 
@@ -45,13 +55,42 @@ class BaseQueryReader:
     Base class for reading queries from a file.
     """
 
-    def __init__(self, file_path, lang="english", stem: bool = True):
+    def __init__(
+        self,
+        file_path,
+        lang="english",
+        stem: bool = True,
+        cache_dir: str = None,
+        tokenizer: TokenizerMode = TokenizerMode.NLTK,
+        workers: int = 1,
+    ):
         self.file_path = file_path
         self.queries = self.get_queries()
-        self.parser = BaseParser(lang)
+        self.parser = BaseParser(lang, tokenizer)
+
+        cache = ParseCache(cache_dir) if cache_dir else None
+        if cache:
+            cache_key = ParseCache.key(
+                file_path,
+                {"reader": type(self).__qualname__, "stem": stem, "parser": self.parser.config()},
+            )
+            cached = cache.load(cache_key)
+            if cached is not None:
+                self.load_cached(cached)
+                return
+
+        # Reuse the stems persisted by earlier parses
+        if cache and stem:
+            self.parser.stem_cache.load(cache.stems_path(lang))
 
         # Parse the queries
-        self.parse_queries(stem)
+        self.parse_queries(stem, workers)
+
+        if cache and stem:
+            self.parser.stem_cache.save(cache.stems_path(lang))
+
+        if cache:
+            cache.save(cache_key, self.to_cached())
 
     def get_queries(self) -> List[dict]:
         """
@@ -69,7 +108,7 @@ class BaseQueryReader:
         """
         raise NotImplementedError
 
-    def parse_queries(self, stem: bool = True):
+    def parse_queries(self, stem: bool = True, workers: int = 1):
         """
         Parse the queries into a list of dictionaries.
 
@@ -78,11 +117,39 @@ class BaseQueryReader:
 
         Args:
             stem (bool): Whether to stem the tokens.
+            workers (int): Number of processes to tokenize with.
         """
 
         # Tokenization
-        for query in self.queries:
-            query["tokens"] = self.parser.parse(query["query"], stem)
+        token_lists = self.parser.parse_many(
+            [query["query"] for query in self.queries], stem, workers
+        )
+        for query, tokens in zip(self.queries, token_lists):
+            query["tokens"] = tokens
+
+    def to_cached(self) -> Dict[str, np.ndarray]:
+        """
+        Packs the parsed tokens into arrays for `ParseCache`.
+
+        Returns:
+            A dictionary of arrays.
+        """
+        arrays = ParseCache.pack_tokens([query["tokens"] for query in self.queries])
+        arrays["query_ids"] = np.array(
+            [query["query_id"] for query in self.queries], dtype=np.int64
+        )
+        return arrays
+
+    def load_cached(self, arrays: Dict[str, np.ndarray]):
+        """
+        Restores the parsed tokens packed by `to_cached`.
+
+        Args:
+            arrays (dict): The cached arrays.
+        """
+        _, token_lists = ParseCache.unpack_tokens(arrays)
+        for query, tokens in zip(self.queries, token_lists):
+            query["tokens"] = tokens
 
     def to_query_list(self) -> List[Query]:
         """
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+import numpy as np
+
+
+SCORE_DECIMALS = 10
+"""
+Scores are compared after rounding to this many decimals, so documents
+with mathematically equal scores tie regardless of summation order.
+"""
+
+
+@dataclass
+class Ranking:
+    """
+    Top ranked documents of a batch of queries, best first.
+    """
+
+    doc_numbers: np.ndarray
+    """
+    Document numbers of the ranked documents, one row per query.
+    """
+    doc_ids: np.ndarray
+    """
+    Document IDs of the ranked documents, one row per query.
+    """
+    scores: np.ndarray
+    """
+    Similarity scores of the ranked documents, one row per query.
+    """
+
+    @staticmethod
+    def top_k(scores: np.ndarray, doc_ids: np.ndarray, k: int) -> "Ranking":
+        """
+        Selects the `k` best scoring documents of every query without sorting
+        whole score rows. Ties are broken by ascending document ID.
+
+        Args:
+            `scores`: score matrix, rows are queries and columns are document numbers
+            `doc_ids`: document ID of each column
+            `k`: number of documents to keep per query
+
+        Returns:
+            A `Ranking` with `min(k, documents)` documents per query.
+        """
+        doc_ids = np.asarray(doc_ids)
+        query_count, doc_count = scores.shape
+        k = min(k, doc_count)
+        if k == 0:
+            empty = np.zeros((query_count, 0), dtype=np.int64)
+            return Ranking(empty, doc_ids[empty], scores[:, :0])
+
+        # The k-th best score of each row, the partition places it k from the end.
+        # Only documents that can round up to it are candidates
+        kth = np.partition(scores, doc_count - k, axis=1)[:, doc_count - k : doc_count - k + 1]
+        rows, columns = np.nonzero(scores >= kth - 10.0 ** -SCORE_DECIMALS)
+
+        # Order the candidates by query, then score, then document ID
+        rounded = np.round(scores[rows, columns], SCORE_DECIMALS)
+        order = np.lexsort((doc_ids[columns], -rounded, rows))
+
+        # Every query has at least k candidates, keep the first k of each
+        starts = np.zeros(query_count, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=query_count)[:-1], out=starts[1:])
+        kept = order[starts[:, None] + np.arange(k)]
+
+        doc_numbers = columns[kept]
+        return Ranking(
+            doc_numbers,
+            doc_ids[doc_numbers],
+            scores[rows[kept], doc_numbers],
+        )
@@ -1,9 +1,14 @@
-import math
-import nltk
 import pandas as pd
-from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, Iterator, List, Set
+import numpy as np
+from scipy import sparse
+from base.cache import ParseCache
+from base.choices import TokenizerMode
+from base.lexicon import Lexicon
+from base.matrix import TermDocMatrix
 from base.parser import BaseParser
+from base.store import DocumentStore
+from base import profiling
 
 
 class BaseDocReader:
@@ -12,31 +17,131 @@ class BaseDocReader:
 
     Attributes:
         file_path (str): The path to the file to read.
-        docs (list): A list of dictionaries, where each dictionary represents a document.
-        word_set (set): A set of unique words in the documents.
+        store (DocumentStore): The tokens of the documents, None when the documents are streamed.
+        stem (bool): Whether the tokens are stemmed.
+        stream (bool): Whether the documents are streamed, see `stream_docs`, or counted
+                       elsewhere, see `from_matrix`.
+        tf_matrix (TermDocMatrix): The sparse term frequency matrix, its `lexicon` holds
+                                   the terms, every other structure holds term IDs.
     """
-    stemmer = nltk.PorterStemmer()
 
-    def __init__(self, file_path, lang="english", stem: bool = True):
+    def __init__(
+        self,
+        file_path,
+        lang="english",
+        stem: bool = True,
+        cache_dir: str = None,
+        tokenizer: TokenizerMode = TokenizerMode.NLTK,
+        workers: int = 1,
+        stream: bool = False,
+        tf_matrix: TermDocMatrix = None,
+    ):
         self.file_path = file_path
-        self.docs = self.get_docs()
-        self.tf_table = None
-        self.wc_table = defaultdict(int)
-        self.word_set = set()
-        self.parser = BaseParser(lang)
+        self.stem = stem
+        self.stream = stream or tf_matrix is not None
+        self.store = None
+        self.tf_matrix = tf_matrix
+        self.parser = BaseParser(lang, tokenizer)
+
+        # The documents were counted elsewhere, the file is not read
+        if tf_matrix is not None:
+            return
+
+        cache = ParseCache(cache_dir) if cache_dir else None
+        if cache:
+            cache_key = ParseCache.key(
+                file_path,
+                {
+                    "reader": type(self).__qualname__,
+                    "stem": stem,
+                    "stream": stream,
+                    "parser": self.parser.config(),
+                },
+            )
+            cached = cache.load(cache_key)
+            if cached is not None:
+                with profiling.span("load_cached"):
+                    self.load_cached(cached)
+                    profiling.count("documents", len(self.tf_matrix))
+                return
+
+        # Reuse the stems persisted by earlier parses
+        if cache and stem:
+            self.parser.stem_cache.load(cache.stems_path(lang))
 
         # Parse the documents
-        self.parse_docs(stem)
+        if stream:
+            with profiling.span("stream_docs", workers=workers):
+                self.stream_docs(stem, workers)
+        else:
+            with profiling.span("get_docs"):
+                docs = self.get_docs()
+            with profiling.span("parse_docs", workers=workers):
+                self.parse_docs(stem, workers, docs)
+
+        if cache and stem:
+            self.parser.stem_cache.save(cache.stems_path(lang))
 
         # Build document stats
-        self.build_doc_stats()
+        with profiling.span("build_doc_stats"):
+            self.build_doc_stats()
+            profiling.count("documents", len(self.tf_matrix))
+
+        if cache:
+            cache.save(cache_key, self.to_cached())
+
+    @classmethod
+    def from_matrix(
+        cls,
+        file_path,
+        matrix_path,
+        mmap_mode: str = "r",
+        lang="english",
+        stem: bool = True,
+        tokenizer: TokenizerMode = TokenizerMode.NLTK,
+    ) -> "BaseDocReader":
+        """
+        Opens a term frequency matrix saved with `TermDocMatrix.save` as the
+        counts of the documents instead of reading the file. With the
+        default `mmap_mode` the matrix is memory-mapped read-only, so every
+        process opening the same directory shares one copy of it. Like a
+        streamed reader, the reader keeps no tokens; documents added later
+        are parsed with the given settings.
+
+        Args:
+            file_path (str): The path to the file the matrix was counted from.
+            matrix_path (str): The directory the matrix was saved to.
+            mmap_mode (str): Memory-map mode of the matrix arrays, read if None.
+            lang (str): The language of the documents.
+            stem (bool): Whether the matrix holds stemmed tokens.
+            tokenizer (TokenizerMode): The tokenizer the matrix was counted with.
+
+        Returns:
+            BaseDocReader: A reader over the saved matrix.
+        """
+        return cls(
+            file_path,
+            lang,
+            stem,
+            tokenizer=tokenizer,
+            tf_matrix=TermDocMatrix.load(matrix_path, mmap_mode=mmap_mode),
+        )
 
     def get_docs(self) -> List[dict]:
         """
-        Parse the file into a list of documents.
+        Parse the file into a list of documents, see `iter_docs`.
 
         Returns:
             list: A list of dictionaries, where each dictionary represents a document.
+        """
+        return list(self.iter_docs())
+
+    def iter_docs(self) -> Iterator[dict]:
+        """
+        Reads the file one document at a time, without holding the whole file.
+
+        Yields:
+            dict: A dictionary representing a document.
 
         [
             {
@@ -48,56 +153,204 @@ class BaseDocReader:
         """
         raise NotImplementedError
 
-    def parse_docs(self, stem: bool = True):
+    def parse_docs(self, stem: bool = True, workers: int = 1, docs: List[dict] = None):
         """
-        Parse the documents into a list of dictionaries.
+        Parse the documents into the document store. Only the tokens are
+        kept, the other fields are read again when needed, see `DocumentStore`.
 
         - Tokenization
         - Removing stopwords
 
         Args:
             stem (bool): Whether to stem the tokens.
+            workers (int): Number of processes to tokenize with.
+            docs (list): The documents, read with `get_docs` if None.
         """
+        if docs is None:
+            docs = self.get_docs()
 
-        # Tokenization
-        for doc in self.docs:
-            doc["tokens"] = self.parser.parse(doc["content"], stem)
-            self.word_set.update(doc["tokens"])
+        # Tokenization, each document is interned as soon as it is parsed
+        contents = ((doc["doc_id"], doc["content"]) for doc in docs)
+        self.store = DocumentStore.from_token_stream(
+            self.parser.iter_parse(contents, stem, workers), self.iter_docs
+        )
+
+    def stream_docs(self, stem: bool = True, workers: int = 1):
+        """
+        Reads, tokenizes and counts the documents one at a time, straight
+        into the term frequency matrix. Neither the file, the document
+        contents nor their tokens are held, only the matrix.
+
+        Args:
+            stem (bool): Whether to stem the tokens.
+            workers (int): Number of processes to tokenize with.
+        """
+        contents = ((doc["doc_id"], doc["content"]) for doc in self.iter_docs())
+        self.tf_matrix = TermDocMatrix.from_token_stream(
+            self.parser.iter_parse(contents, stem, workers)
+        )
 
     def build_doc_stats(self):
         """
         Build stats for the documents.
-        - Term frequency table
-        - Word count table
+        - Term frequency matrix
+        - Document frequencies
         """
 
-        word_list = list(self.word_set)
-        word_list.sort()
+        # Streamed documents are counted as they are read
+        if self.tf_matrix is None:
+            self.tf_matrix = self.store.to_matrix()
+
+        self.tf_matrix.document_frequencies()
+
+    def to_cached(self) -> Dict[str, np.ndarray]:
+        """
+        Packs the parsed tokens and the term frequency matrix into arrays for
+        `ParseCache`. Document frequencies are recounted from the matrix.
 
-        # Create a word count table
-        self.tf_table = pd.DataFrame(
-            0, index=[doc["doc_id"] for doc in self.docs], columns=word_list
+        Returns:
+            A dictionary of arrays.
+        """
+        # Streamed documents have no tokens to keep
+        if self.stream:
+            arrays = {"terms": np.array(self.tf_matrix.terms, dtype=str)}
+        else:
+            arrays = self.store.to_arrays()
+        arrays.update(
+            {
+                "doc_ids": np.array(self.tf_matrix.doc_ids, dtype=np.int64),
+                "tf_data": self.tf_matrix.matrix.data,
+                "tf_indices": self.tf_matrix.matrix.indices,
+                "tf_indptr": self.tf_matrix.matrix.indptr,
+            }
         )
+        return arrays
 
-        for doc in self.docs:
-            for token in doc["tokens"]:
-                self.tf_table.at[doc["doc_id"], token] += 1
-            for token in set(doc["tokens"]):
-                self.wc_table[token] += 1
+    def load_cached(self, arrays: Dict[str, np.ndarray]):
+        """
+        Restores the parsed tokens and the term frequency matrix packed by
+        `to_cached`.
+
+        Args:
+            arrays (dict): The cached arrays.
+        """
+        # The store and the matrix share one lexicon
+        lexicon = Lexicon(arrays["terms"].tolist())
+        doc_ids = arrays["doc_ids"].tolist()
+        if "token_ids" in arrays:
+            self.store = DocumentStore(
+                arrays["doc_ids"], lexicon, arrays["token_ids"], arrays["token_offsets"], self.iter_docs
+            )
+
+        matrix = sparse.csr_matrix(
+            (arrays["tf_data"], arrays["tf_indices"], arrays["tf_indptr"]),
+            shape=(len(doc_ids), len(lexicon)),
+        )
+        self.tf_matrix = TermDocMatrix(matrix, lexicon, doc_ids)
+
+    def add_documents(self, docs: List[dict], workers: int = 1) -> TermDocMatrix:
+        """
+        Parses documents and adds them to the collection. Only the new
+        documents are tokenized, the term frequency matrix, document
+        frequencies and vocabulary are extended with them.
+
+        Args:
+            docs (list): Documents in the format of `get_docs`.
+            workers (int): Number of processes to tokenize with.
+
+        Returns:
+            TermDocMatrix: The term frequencies of the added documents alone.
+        """
+        doc_ids = [doc["doc_id"] for doc in docs]
+        if len(set(doc_ids)) != len(doc_ids):
+            raise Exception("Added documents have duplicate IDs.")
+        for doc_id in doc_ids:
+            if doc_id in self.tf_matrix.doc_index:
+                raise Exception(f"Document already in the collection: {doc_id}")
+
+        contents = ((doc["doc_id"], doc["content"]) for doc in docs)
+        parsed = self.parser.iter_parse(contents, self.stem, workers)
+        if self.stream:
+            added = TermDocMatrix.from_token_stream(parsed)
+        else:
+            store = DocumentStore.from_token_stream(parsed, fields=docs)
+            added = store.to_matrix()
+            self.store = self.store.append(store)
+
+        self.tf_matrix = self.tf_matrix.append(added)
+
+        return added
+
+    def remove_documents(self, doc_ids: List[int]):
+        """
+        Removes documents from the collection. Terms only they held leave
+        the vocabulary.
+
+        Args:
+            doc_ids (list): IDs of the documents to remove.
+        """
+        if len(set(doc_ids)) != len(doc_ids):
+            raise Exception("Removed document IDs have duplicates.")
+        for doc_id in doc_ids:
+            if doc_id not in self.tf_matrix.doc_index:
+                raise Exception(f"Document not in the collection: {doc_id}")
+
+        self.tf_matrix = self.tf_matrix.drop(doc_ids)
+
+        if not self.stream:
+            self.store = self.store.drop(doc_ids)
+
+    @property
+    def docs(self) -> List[dict]:
+        """
+        The documents, in the format of `get_docs` with their `tokens`,
+        empty when the documents are streamed.
+
+        Built from `store` on every access, the first one reads the
+        documents again. Prefer `store` outside of inspection and debugging.
+        """
+        if self.store is None:
+            return []
+        return [self.store.document(row) for row in range(len(self.store))]
+
+    @property
+    def word_set(self) -> Set[str]:
+        """
+        The distinct terms of the documents.
+
+        Built from the lexicon of `tf_matrix` on every access.
+        """
+        return set(self.tf_matrix.terms)
+
+    @property
+    def wc_table(self) -> Dict[str, int]:
+        """
+        A dictionary mapping each term to its document frequency.
+
+        Built from `tf_matrix` on every access, prefer
+        `tf_matrix.document_frequencies()`, indexed by term ID.
+        """
+        return dict(zip(self.tf_matrix.terms, self.tf_matrix.document_frequencies().tolist()))
+
+    @property
+    def tf_table(self) -> pd.DataFrame:
+        """
+        Dense term frequency table. Rows are documents and columns are terms.
+
+        Built from `tf_matrix` on every access, prefer `tf_matrix` outside
+        of inspection and debugging.
+        """
+        if self.tf_matrix is None:
+            return None
+        return self.tf_matrix.to_frame()
 
     def get_term_idfs(self) -> Dict[str, float]:
         """
         Extracts all term inverted document frequencies from stored
-        documents.
+        documents, from the cached `TermDocMatrix.idfs`.
 
         Returns:
             Inverted document frequencies for each term.
         """
 
-        idfs = {}
-        document_quantity = len(self.docs)
-
-        for (term, df) in self.wc_table.items():
-            idfs[term] = math.log(document_quantity / df)
-
-        return idfs
+        return dict(zip(self.tf_matrix.terms, self.tf_matrix.idfs().tolist()))
@@ -0,0 +1,299 @@
+import numpy as np
+from scipy import sparse
+from base import profiling
+from base.index import InvertedIndex
+from base.ranking import SCORE_DECIMALS, Ranking
+
+
+MATRIX_SETUP_TERMS = 24
+"""
+Query terms a batch can hold and still be scored term at a time, visiting
+them costs about as much as setting up one sparse matrix product.
+"""
+
+MATRIX_POSTINGS_PER_TERM = 1000
+"""
+Postings per extra query term a batch is scored term at a time for. A
+matrix product costs more per posting, so batches reading many postings
+stay term at a time longer.
+"""
+
+
+class Scorer:
+    """
+    Scores weighted queries against an inverted index, the similarity of a
+    query to a document being the dot product of their weights. Scorers
+    differ in the order postings are visited, not in the scores.
+
+    Attributes:
+        postings_visited (int): Number of postings read so far.
+    """
+
+    def __init__(self):
+        self.postings_visited = 0
+
+    def score(self, query_matrix: sparse.csr_matrix, inverted_index: InvertedIndex) -> np.ndarray:
+        """
+        Calculates the similarity of every query to every indexed document.
+        Scaled indexes apply the scale of each document to its scores, one
+        multiply per document.
+
+        Args:
+            `query_matrix`: query-term matrix of the weighted queries
+            `inverted_index`: inverted index of the weighted documents
+
+        Returns:
+            A dense score matrix. Rows are queries, in order, and columns
+            are document numbers of the index.
+        """
+        scores = np.zeros((query_matrix.shape[0], len(inverted_index.doc_ids)), dtype=np.float64)
+        for row in range(query_matrix.shape[0]):
+            start, end = query_matrix.indptr[row], query_matrix.indptr[row + 1]
+            self.score_query(
+                query_matrix.indices[start:end],
+                query_matrix.data[start:end],
+                inverted_index,
+                scores[row],
+            )
+
+        if inverted_index.scales is not None:
+            scores *= inverted_index.scales
+        return scores
+
+    def top_k(self, query_matrix: sparse.csr_matrix, inverted_index: InvertedIndex, k: int) -> Ranking:
+        """
+        Retrieves the `k` most similar documents of every query, see
+        `Ranking.top_k`. Documents with a non-zero score are counted as
+        `candidates` by an active profiler.
+
+        Args:
+            `query_matrix`: query-term matrix of the weighted queries
+            `inverted_index`: inverted index of the weighted documents
+            `k`: number of documents to retrieve per query
+
+        Returns:
+            The `Ranking` of the retrieved documents.
+        """
+        scores = self.score(query_matrix, inverted_index)
+        if profiling.enabled():
+            profiling.count("candidates", int(np.count_nonzero(scores)))
+
+        with profiling.span("sort"):
+            return Ranking.top_k(scores, inverted_index.doc_ids, k)
+
+    def score_query(
+        self,
+        cols: np.ndarray,
+        query_weights: np.ndarray,
+        inverted_index: InvertedIndex,
+        accumulator: np.ndarray,
+    ):
+        """
+        Adds the unscaled similarity of one query to every document to an
+        accumulator.
+
+        Args:
+            `cols`: index columns of the query terms
+            `query_weights`: weight of each query term
+            `inverted_index`: inverted index of the weighted documents
+            `accumulator`: score of each document number, updated in place
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def choose(query_matrix: sparse.csr_matrix, inverted_index: InvertedIndex) -> "Scorer":
+        """
+        Picks the faster scorer for a batch of queries. Term at a time
+        scoring costs mostly a step per query term, a matrix product a fixed
+        setup and a higher cost per posting. Batches are scored term at a
+        time up to `MATRIX_SETUP_TERMS` query terms, plus one term per
+        `MATRIX_POSTINGS_PER_TERM` postings they read, and as one matrix
+        product above.
+
+        Args:
+            `query_matrix`: query-term matrix of the weighted queries
+            `inverted_index`: inverted index of the weighted documents
+
+        Returns:
+            The `Scorer` to use.
+        """
+        postings = int(np.diff(inverted_index.offsets)[query_matrix.indices].sum())
+        if query_matrix.nnz <= MATRIX_SETUP_TERMS + postings / MATRIX_POSTINGS_PER_TERM:
+            return TermAtATimeScorer()
+        return MatrixScorer()
+
+
+class MatrixScorer(Scorer):
+    """
+    Scores a whole batch of queries as one sparse matrix product with the
+    postings.
+    """
+
+    def score(self, query_matrix, inverted_index):
+        self.postings_visited += int(np.diff(inverted_index.offsets)[query_matrix.indices].sum())
+        scores = (query_matrix @ inverted_index.to_matrix().T).toarray()
+        if inverted_index.scales is not None:
+            scores *= inverted_index.scales
+        return scores
+
+    def score_query(self, cols, query_weights, inverted_index, accumulator):
+        self.postings_visited += int(np.diff(inverted_index.offsets)[cols].sum())
+        accumulator += inverted_index.to_matrix()[:, cols] @ query_weights
+
+
+class TermAtATimeScorer(Scorer):
+    """
+    Walks the postings of one query term at a time, adding each posting's
+    contribution to a dense accumulator indexed by document number.
+    """
+
+    def score_query(self, cols, query_weights, inverted_index, accumulator):
+        offsets = inverted_index.offsets
+        for col, query_weight in zip(cols.tolist(), query_weights.tolist()):
+            start, end = offsets[col], offsets[col + 1]
+            self.postings_visited += int(end - start)
+            # A term's postings hold each document once, so the scatter never collides
+            accumulator[inverted_index.doc_numbers[start:end]] += (
+                query_weight * inverted_index.weights[start:end]
+            )
+
+
+class MaxScoreScorer(TermAtATimeScorer):
+    """
+    Retrieves the top documents without reading every posting, MaxScore
+    style. Query terms are visited from the highest upper bound (query
+    weight times the term's highest document weight) down. Once the upper
+    bounds of the terms left cannot lift an unseen document to the current
+    k-th best score, only the candidates that still can are looked up in
+    the remaining postings, by binary search. The retrieved documents and
+    their scores are those of exhaustive scoring, ties included.
+    """
+
+    def top_k(self, query_matrix, inverted_index, k):
+        doc_count = len(inverted_index.doc_ids)
+        scales = inverted_index.scales
+        if scales is None:
+            scales = np.ones(doc_count, dtype=np.float64)
+        if query_matrix.shape[0] == 0:
+            return Ranking.top_k(np.zeros((0, doc_count)), inverted_index.doc_ids, k)
+
+        rankings = []
+        for row in range(query_matrix.shape[0]):
+            start, end = query_matrix.indptr[row], query_matrix.indptr[row + 1]
+            accumulator = np.zeros(doc_count, dtype=np.float64)
+            candidates = self.score_top_query(
+                query_matrix.indices[start:end],
+                query_matrix.data[start:end],
+                inverted_index,
+                k,
+                accumulator,
+            )
+            profiling.count("candidates", len(candidates))
+
+            # Without pruning every score is exact, documents scoring 0 fill the ranking
+            if len(candidates) < k:
+                candidates = np.arange(doc_count)
+
+            # Only the candidates are ranked
+            ranking = Ranking.top_k(
+                (accumulator[candidates] * scales[candidates])[np.newaxis],
+                inverted_index.doc_ids[candidates],
+                k,
+            )
+            ranking.doc_numbers = candidates[ranking.doc_numbers]
+            rankings.append(ranking)
+
+        return Ranking(
+            np.vstack([ranking.doc_numbers for ranking in rankings]),
+            np.vstack([ranking.doc_ids for ranking in rankings]),
+            np.vstack([ranking.scores for ranking in rankings]),
+        )
+
+    def score_top_query(
+        self,
+        cols: np.ndarray,
+        query_weights: np.ndarray,
+        inverted_index: InvertedIndex,
+        k: int,
+        accumulator: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Scores the documents of one query that can be among its `k` best.
+
+        Args:
+            `cols`: index columns of the query terms
+            `query_weights`: weight of each query term
+            `inverted_index`: inverted index of the weighted documents
+            `k`: number of documents to retrieve
+            `accumulator`: unscaled score of each document number, updated in place.
+                           Exact for the returned candidates, partial for the others.
+
+        Returns:
+            The document numbers of the candidates, every document that can
+            rank among the `k` best.
+        """
+        doc_count = len(inverted_index.doc_ids)
+        scales = inverted_index.scales
+        offsets = inverted_index.offsets
+        # Documents within rounding of the k-th best score can still tie with it
+        margin = 10.0 ** -SCORE_DECIMALS
+
+        bounds = query_weights * inverted_index.max_weights()[cols]
+        order = np.argsort(-bounds, kind="stable")
+        cols, query_weights, bounds = cols[order], query_weights[order], bounds[order]
+        # Upper bounds of the score the terms up to and after each one can add
+        visited = np.cumsum(bounds)
+        remaining = visited[-1] - visited if len(bounds) else bounds
+
+        # Until pruning starts, the current k best documents. Only the
+        # documents of the last term visited can join them
+        top = np.empty(0, dtype=np.int64)
+        in_top = np.zeros(doc_count, dtype=bool)
+
+        candidates = None
+        for i, (col, query_weight) in enumerate(zip(cols.tolist(), query_weights.tolist())):
+            doc_numbers = inverted_index.doc_numbers[offsets[col] : offsets[col + 1]]
+            weights = inverted_index.weights[offsets[col] : offsets[col + 1]]
+
+            if candidates is None:
+                self.postings_visited += len(doc_numbers)
+                accumulator[doc_numbers] += query_weight * weights
+            else:
+                positions = np.searchsorted(doc_numbers, candidates)
+                found = positions < len(doc_numbers)
+                found[found] = doc_numbers[positions[found]] == candidates[found]
+                self.postings_visited += int(found.sum())
+                accumulator[candidates[found]] += query_weight * weights[positions[found]]
+
+            # Nothing is pruned when k covers the collection, or is empty
+            if not 0 < k < doc_count or i + 1 == len(cols):
+                continue
+
+            # The k-th best score so far bounds the final k-th best score from below
+            pool = candidates
+            if candidates is None:
+                pool = np.concatenate([top, doc_numbers[~in_top[doc_numbers]]])
+            current = accumulator[pool]
+            if scales is not None:
+                current *= scales[pool]
+            if len(pool) < k:
+                top = pool
+                in_top[top] = True
+                continue
+            kth = np.argpartition(current, len(pool) - k)[len(pool) - k :]
+            threshold = current[kth].min()
+
+            if candidates is not None:
+                candidates = candidates[current + remaining[i] >= threshold - margin]
+            elif remaining[i] < threshold - margin:
+                # Unseen documents score at most the remaining bound
+                scores = accumulator if scales is None else accumulator * scales
+                candidates = np.flatnonzero(scores + remaining[i] >= threshold - margin)
+            else:
+                in_top[top] = False
+                top = pool[kth]
+                in_top[top] = True
+
+        if candidates is None:
+            return np.flatnonzero(accumulator)
+        return candidates
@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+import re
+
+
+# A field marker line, i.e. ".W" or ".I 12"
+_MARKER = re.compile(r"\.([A-Z])(?:\s|$)")
+
+
+@dataclass
+class SmartRecord:
+    """
+    A record of a SMART-format file, a `.I <id>` line followed by fields,
+    each started by a `.<letter>` marker line.
+    """
+
+    id: int
+    """
+    The record ID, from its `.I` line.
+    """
+    fields: Dict[str, List[str]]
+    """
+    The lines of each field found in the record, newlines included, keyed by
+    marker letter, i.e. `W`.
+    """
+
+    def text(self, field: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Gets the raw text of a field.
+
+        Args:
+            `field`: the marker letter of the field, i.e. `W`
+            `default`: the value of a missing field
+
+        Returns:
+            The lines of the field joined, or `default` if the record has no such field.
+        """
+        if field not in self.fields:
+            return default
+        return "".join(self.fields[field])
+
+
+def iter_smart_records(
+    file_path: str,
+    fields: str,
+    open_field: Optional[str] = None,
+) -> Iterator[SmartRecord]:
+    """
+    Reads a SMART-format file one record at a time, finding the field
+    boundaries in a single pass over its lines.
+
+    - a field runs up to the next marker of `fields`, other marker lines
+      are part of its text
+    - `open_field` runs up to the end of the record instead, every marker
+      line but its own being part of its text
+    - a field that appears again in a record is ignored
+
+    Args:
+        `file_path`: the file to read
+        `fields`: marker letters of the fields to find, i.e. `TAW`
+        `open_field`: marker letter of a field running to the end of the record
+
+    Yields:
+        `SmartRecord`: Each record of the file, in order.
+    """
+    record = None
+    key = None
+    with open(file_path, "r") as f:
+        for line in f:
+            marker = _MARKER.match(line) if line.startswith(".") else None
+            letter = marker.group(1) if marker else None
+
+            if letter == "I":
+                if record:
+                    yield record
+                record = SmartRecord(int(line.split()[1]), {})
+                key = None
+            elif record is None:
+                continue
+            elif key is not None and key == open_field and letter != open_field:
+                record.fields[key].append(line)
+            elif letter is not None and letter in fields:
+                key = letter if letter not in record.fields else None
+                if key:
+                    record.fields[key] = []
+            elif key:
+                record.fields[key].append(line)
+
+        if record:
+            yield record
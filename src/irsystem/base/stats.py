@@ -0,0 +1,96 @@
+from typing import Dict, Optional, Tuple
+import numpy as np
+from base.choices import IDFMode, TFMode
+from base.matrix import TermDocMatrix
+
+
+def tf_weights(tfs: np.ndarray, tfmode: TFMode, max_tfs: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Values term frequencies with a term frequency mode.
+
+    Args:
+        `tfs`: raw term frequencies
+        `tfmode`: the term frequency mode
+        `max_tfs`: highest term frequency of the row of each value, only used by `TFMode.A`
+
+    Returns:
+        A new float array, aligned with `tfs`.
+    """
+    if tfmode == TFMode.N:
+        return tfs.astype(np.float64)
+    elif tfmode == TFMode.L:
+        return 1 + np.log(tfs)
+    elif tfmode == TFMode.A:
+        return tfs / max_tfs * 0.5 + 0.5
+    elif tfmode == TFMode.B:
+        return np.ones(len(tfs), dtype=np.float64)
+
+
+class DocumentStats:
+    """
+    Per-document statistics of a term frequency matrix that term weighting
+    needs. Each statistic is computed on first use and kept, so it is
+    computed once per collection whatever the number of weightings.
+
+    Attributes:
+        tf_matrix (TermDocMatrix): The term frequency matrix the statistics are of.
+        lengths (np.ndarray): The number of tokens of each document.
+    """
+
+    def __init__(self, tf_matrix: TermDocMatrix):
+        self.tf_matrix = tf_matrix
+        self.lengths = tf_matrix.doc_lengths
+        self._max_tfs = None
+        self._norms: Dict[Tuple[TFMode, IDFMode], np.ndarray] = {}
+
+    def max_tfs(self) -> np.ndarray:
+        """
+        Highest term frequency of each document, 0 for an empty document.
+
+        Returns:
+            An array with one value per document.
+        """
+        if self._max_tfs is None:
+            self._max_tfs = self.tf_matrix.row_reduce(np.maximum, self.tf_matrix.matrix.data)
+        return self._max_tfs
+
+    def weights(self, tfmode: TFMode, idfmode: IDFMode) -> np.ndarray:
+        """
+        Weights the stored term frequencies, before any normalization.
+
+        Args:
+            `tfmode`: the term frequency mode
+            `idfmode`: the inverse document frequency mode
+
+        Returns:
+            The weight of each stored cell, aligned with `tf_matrix.matrix.data`.
+        """
+        # Calculate the tf values
+        max_tfs = self.max_tfs()[self.tf_matrix.rows()] if tfmode == TFMode.A else None
+        values = tf_weights(self.tf_matrix.matrix.data, tfmode, max_tfs)
+
+        # Calculate the idf values
+        if idfmode == IDFMode.T:
+            values *= self.tf_matrix.idfs()[self.tf_matrix.matrix.indices]
+
+        return values
+
+    def norm(self, tfmode: TFMode, idfmode: IDFMode) -> np.ndarray:
+        """
+        Cosine norm of each document's weights, 1 for a document without
+        weights so that dividing by it is always safe.
+
+        Args:
+            `tfmode`: the term frequency mode
+            `idfmode`: the inverse document frequency mode
+
+        Returns:
+            An array with one value per document.
+        """
+        key = (tfmode, idfmode)
+        if key not in self._norms:
+            values = self.weights(tfmode, idfmode)
+            norms = np.sqrt(self.tf_matrix.row_reduce(np.add, values * values))
+            norms[norms == 0] = 1
+            self._norms[key] = norms
+        return self._norms[key]
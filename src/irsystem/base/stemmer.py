@@ -0,0 +1,140 @@
+from pathlib import Path
+from typing import Dict, List, Union
+import json
+import os
+import nltk
+
+
+class StemCache:
+    """
+    Memoized stemmer. Stemming is a pure function of the surface form and
+    token frequencies are heavily skewed, so most tokens are stemmed from
+    the memo instead of by the stemmer. Parsers of the same language share
+    one cache through `StemCache.shared`, across documents and queries.
+
+    Attributes:
+        stemmer (nltk.PorterStemmer): The stemmer results are memoized from.
+        max_size (int): Maximum number of memoized stems, later surface forms
+                        are stemmed without being stored.
+        stems (dict): The memoized stem of each surface form.
+        hits (int): Number of tokens stemmed from the memo.
+        misses (int): Number of tokens stemmed by the stemmer.
+    """
+
+    _shared: Dict[str, "StemCache"] = {}
+
+    def __init__(self, max_size: int = 1 << 20):
+        self.stemmer = nltk.PorterStemmer()
+        self.max_size = max_size
+        self.stems: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def shared(lang: str = "english") -> "StemCache":
+        """
+        Gets the cache shared by every parser of a language in this process.
+
+        Args:
+            `lang`: the language of the parsed text
+
+        Returns:
+            The shared `StemCache`, created on first use.
+        """
+        if lang not in StemCache._shared:
+            StemCache._shared[lang] = StemCache()
+        return StemCache._shared[lang]
+
+    def stem(self, tokens: List[str]) -> List[str]:
+        """
+        Stems tokens, memoizing every new surface form while there is room.
+
+        Args:
+            `tokens`: the tokens to stem
+
+        Returns:
+            The stem of each token, in order.
+        """
+        stems = self.stems
+        stemmed = []
+        misses = 0
+
+        for token in tokens:
+            stem = stems.get(token)
+            if stem is None:
+                misses += 1
+                stem = self.stemmer.stem(token)
+                if len(stems) < self.max_size:
+                    stems[token] = stem
+            stemmed.append(stem)
+
+        self.misses += misses
+        self.hits += len(tokens) - misses
+        return stemmed
+
+    def hit_rate(self) -> float:
+        """
+        Returns:
+            The share of stemmed tokens served from the memo, 0 before any.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def config(self) -> Dict[str, str]:
+        """
+        Settings the stems depend on, persisted stems of other settings are
+        not loaded.
+
+        Returns:
+            A JSON-serializable dictionary of the stemmer settings.
+        """
+        return {
+            "stemmer": type(self.stemmer).__name__,
+            "mode": self.stemmer.mode,
+            "nltk": nltk.__version__,
+        }
+
+    def load(self, path: Union[str, Path]) -> int:
+        """
+        Adds the stems of a dictionary written by `save` to the memo. A
+        missing file or one written with other stemmer settings is ignored.
+
+        Args:
+            `path`: the stem dictionary file
+
+        Returns:
+            The number of stems added.
+        """
+        path = Path(path)
+        if not path.exists():
+            return 0
+
+        persisted = json.loads(path.read_text())
+        if persisted["config"] != self.config():
+            return 0
+
+        added = 0
+        for token, stem in persisted["stems"].items():
+            if len(self.stems) >= self.max_size:
+                break
+            if token not in self.stems:
+                self.stems[token] = stem
+                added += 1
+
+        return added
+
+    def save(self, path: Union[str, Path]):
+        """
+        Writes the memoized stems as a JSON stem dictionary. The file is
+        written to a temporary file first, so a concurrent reader never sees
+        a partial file.
+
+        Args:
+            `path`: the stem dictionary file, its directory is created if missing
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps({"config": self.config(), "stems": self.stems}))
+        os.replace(temp_path, path)
@@ -0,0 +1,260 @@
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from scipy import sparse
+from base.cache import ParseCache
+from base.lexicon import Lexicon
+from base.matrix import TermDocMatrix
+
+
+class DocumentStore:
+    """
+    Columnar store of tokenized documents. The tokens of every document are
+    kept as IDs into one sorted list of distinct terms, one document after
+    another in a flat array, instead of a dictionary and a list of strings
+    per document. This is the layout `ParseCache.pack_tokens` writes.
+
+    The other fields of the documents (title, content, ...) are not kept.
+    They are read again from the collection on first use through
+    `load_metadata`, except those of documents added with their fields.
+
+    Attributes:
+        doc_ids (np.ndarray): The document IDs, in row order.
+        lexicon (Lexicon): The distinct tokens, sorted, the ID of each token is its column
+                           in `to_matrix`.
+        token_ids (np.ndarray): The token IDs of every document, one document after another.
+        token_offsets (np.ndarray): Where the tokens of each document start in `token_ids`,
+                                    followed by the number of tokens.
+    """
+
+    def __init__(
+        self,
+        doc_ids: np.ndarray,
+        terms: Union[List[str], Lexicon],
+        token_ids: np.ndarray,
+        token_offsets: np.ndarray,
+        load_metadata: Optional[Callable[[], Iterable[dict]]] = None,
+        metadata: Optional[Dict[int, dict]] = None,
+    ):
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.lexicon = terms if isinstance(terms, Lexicon) else Lexicon(terms)
+        self.token_ids = token_ids
+        self.token_offsets = token_offsets
+        self._load_metadata = load_metadata
+        self._metadata: Dict[int, dict] = metadata or {}
+        self._metadata_loaded = load_metadata is None
+        self._doc_index = None
+
+    @staticmethod
+    def from_token_stream(
+        docs: Iterable[Tuple[int, List[str]]],
+        load_metadata: Optional[Callable[[], Iterable[dict]]] = None,
+        fields: Optional[List[dict]] = None,
+    ) -> "DocumentStore":
+        """
+        Packs tokenized documents as they are produced. The tokens of each
+        document are interned and appended to the flat arrays before the
+        next document is read, so no token list outlives its document.
+        Same layout as `ParseCache.pack_tokens` over the same documents.
+
+        Args:
+            `docs`: (document ID, tokens) pairs, consumed once
+            `load_metadata`: reads the documents again, i.e. `BaseDocReader.iter_docs`
+            `fields`: the documents, in the format of `get_docs`, to keep the fields of
+
+        Returns:
+            A `DocumentStore` of the documents.
+        """
+        lexicon = Lexicon()
+        doc_ids, token_offsets = [], [0]
+        token_ids = array("i")
+
+        for doc_id, tokens in docs:
+            token_ids.frombytes(lexicon.intern_tokens(tokens, len(tokens)).tobytes())
+            doc_ids.append(doc_id)
+            token_offsets.append(len(token_ids))
+
+        # Tokens are numbered in order of appearance, renumber them in term order
+        lexicon, renumbered = lexicon.sorted()
+
+        metadata = None
+        if fields is not None:
+            metadata = {
+                doc["doc_id"]: {field: value for field, value in doc.items() if field != "tokens"}
+                for doc in fields
+            }
+
+        return DocumentStore(
+            np.array(doc_ids, dtype=np.int64),
+            lexicon,
+            renumbered[np.frombuffer(token_ids, dtype=np.intc)],
+            np.array(token_offsets, dtype=np.int64),
+            load_metadata,
+            metadata,
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def terms(self) -> List[str]:
+        """
+        The distinct tokens, indexed by token ID.
+        """
+        return self.lexicon.terms
+
+    def doc_index(self) -> Dict[int, int]:
+        """
+        Row of each document ID. Cached after the first call.
+
+        Returns:
+            A dictionary mapping each document ID to its row.
+        """
+        if self._doc_index is None:
+            self._doc_index = {doc_id: row for row, doc_id in enumerate(self.doc_ids.tolist())}
+        return self._doc_index
+
+    def tokens(self, row: int) -> List[str]:
+        """
+        Args:
+            `row`: the row of the document
+
+        Returns:
+            The tokens of the document, in order.
+        """
+        start, end = self.token_offsets[row], self.token_offsets[row + 1]
+        return [self.terms[token_id] for token_id in self.token_ids[start:end].tolist()]
+
+    def token_lists(self) -> List[List[str]]:
+        """
+        Returns:
+            The tokens of every document, in row order.
+        """
+        return ParseCache.unpack_tokens(self.to_arrays())[1]
+
+    def metadata(self, doc_id: int) -> dict:
+        """
+        Fields of a document other than its tokens. The first call reads
+        the documents again through `load_metadata`.
+
+        Args:
+            `doc_id`: the document ID
+
+        Returns:
+            The document, in the format of `get_docs`.
+        """
+        if doc_id not in self.doc_index():
+            raise Exception(f"Document not in the store: {doc_id}")
+
+        if doc_id not in self._metadata and not self._metadata_loaded:
+            for doc in self._load_metadata():
+                if doc["doc_id"] in self.doc_index():
+                    self._metadata.setdefault(doc["doc_id"], doc)
+            self._metadata_loaded = True
+
+        return self._metadata.get(doc_id, {"doc_id": doc_id})
+
+    def document(self, row: int) -> dict:
+        """
+        Rebuilds the dictionary of a document.
+
+        Args:
+            `row`: the row of the document
+
+        Returns:
+            The document, in the format of `get_docs`, with its `tokens`.
+        """
+        return dict(self.metadata(int(self.doc_ids[row])), tokens=self.tokens(row))
+
+    def to_matrix(self) -> TermDocMatrix:
+        """
+        Counts the tokens of every document, same result as
+        `TermDocMatrix.from_token_stream` over the same documents.
+
+        Returns:
+            A `TermDocMatrix` holding the raw term frequencies, sharing
+            the `lexicon` of the store.
+        """
+        # Repeated tokens are stored as duplicate entries, summing them gives the
+        # counts. The token arrays are copied, summing sorts them in place
+        matrix = sparse.csr_matrix(
+            (np.ones(len(self.token_ids), dtype=np.int32), self.token_ids, self.token_offsets),
+            shape=(len(self), len(self.terms)),
+            copy=True,
+        )
+        matrix.sum_duplicates()
+
+        return TermDocMatrix(matrix, self.lexicon, self.doc_ids.tolist(), np.diff(self.token_offsets))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Returns:
+            The `terms`, `token_ids` and `token_offsets` arrays, as packed
+            by `ParseCache.pack_tokens`.
+        """
+        return {
+            "terms": np.array(self.terms, dtype=str),
+            "token_ids": self.token_ids,
+            "token_offsets": self.token_offsets,
+        }
+
+    def append(self, other: "DocumentStore") -> "DocumentStore":
+        """
+        Creates a store holding the documents of this store followed by
+        those of another. The term lists are merged, in term order.
+
+        Args:
+            `other`: the documents to append, none of them in this store
+
+        Returns:
+            A new `DocumentStore`, reading metadata through this store's `load_metadata`.
+        """
+        lexicon = Lexicon(sorted(set(self.terms).union(other.terms)))
+        token_ids = [lexicon.lookup(part.terms)[part.token_ids] for part in (self, other)]
+
+        appended = DocumentStore(
+            np.concatenate([self.doc_ids, other.doc_ids]),
+            lexicon,
+            np.concatenate(token_ids),
+            np.concatenate([self.token_offsets, other.token_offsets[1:] + self.token_offsets[-1]]),
+            self._load_metadata,
+            {**self._metadata, **other._metadata},
+        )
+        appended._metadata_loaded = self._metadata_loaded
+        return appended
+
+    def drop(self, doc_ids: Iterable[int]) -> "DocumentStore":
+        """
+        Creates a store without some documents. Terms no remaining document
+        holds are dropped.
+
+        Args:
+            `doc_ids`: IDs of the documents to drop, all of them in this store
+
+        Returns:
+            A new `DocumentStore`.
+        """
+        dropped = set(doc_ids)
+        kept = np.array([doc_id not in dropped for doc_id in self.doc_ids.tolist()], dtype=bool)
+        lengths = np.diff(self.token_offsets)
+        kept_tokens = np.repeat(kept, lengths)
+
+        # Renumber the terms still used, in term order
+        token_ids = self.token_ids[kept_tokens]
+        used = np.zeros(len(self.terms), dtype=bool)
+        used[token_ids] = True
+        renumbered = np.cumsum(used, dtype=np.int32) - 1
+
+        token_offsets = np.zeros(int(kept.sum()) + 1, dtype=np.int64)
+        np.cumsum(lengths[kept], out=token_offsets[1:])
+
+        remaining = DocumentStore(
+            self.doc_ids[kept],
+            [term for term, keep in zip(self.terms, used.tolist()) if keep],
+            renumbered[token_ids],
+            token_offsets,
+            self._load_metadata,
+            {doc_id: doc for doc_id, doc in self._metadata.items() if doc_id not in dropped},
+        )
+        remaining._metadata_loaded = self._metadata_loaded
+        return remaining
@@ -0,0 +1,261 @@
+# mac requirements:
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+import argparse
+import importlib.util
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Tuple
+import pandas as pd
+from base.choices import TokenizerMode, WeightingTriplet
+from base.irs import IRS
+from base.profiling import Profiler
+from base.reader import BaseDocReader
+
+
+COLLECTIONS = {
+    "adi": ("adi.all", "adi.qry", "adi.rel"),
+    "cacm": ("cacm.all", "cacm.qry", "cacm.rel"),
+    "cran": ("cran.all", "cran.qry", "cran.rel"),
+    "med": ("med.all", "med.qry", "med.rel"),
+    "npl": ("npl.all", "npl.qry", "npl.rel"),
+    "time": ("time.all", "time.que", "time.rel"),
+}
+"""
+Test collections bundled with the project, with their document, query and
+relevance files under `<collection>/data`.
+"""
+
+WEIGHTINGS = ["".join(combo) for combo in itertools.product("nlab", "nt", "nc")]
+"""
+All 16 term weighting triplets.
+"""
+
+
+def load_reader_class(collection: str, kind: str) -> type:
+    """
+    Loads a reader class of a bundled collection from its source file. The
+    file is loaded by path since `time` would resolve to the standard
+    library module.
+
+    Args:
+        `collection`: collection name, i.e. `adi`
+        `kind`: `reader`, `query` or `relevance`
+
+    Returns:
+        The reader class, i.e. `AdiDocReader`.
+    """
+    class_suffix = {
+        "reader": "DocReader",
+        "query": "QueryReader",
+        "relevance": "RelevanceReader",
+    }[kind]
+
+    module_path = Path(parent_dir) / collection / f"{kind}.py"
+    spec = importlib.util.spec_from_file_location(f"{collection}_{kind}", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return getattr(module, f"{collection.capitalize()}{class_suffix}")
+
+
+def load_collection(
+    collection: str,
+    stem: bool,
+    doc_reader: BaseDocReader = None,
+    cache_dir: str = None,
+    tokenizer: TokenizerMode = TokenizerMode.NLTK,
+    workers: int = 1,
+) -> IRS:
+    """
+    Reads and parses a bundled collection.
+
+    Args:
+        `collection`: collection name, i.e. `adi`
+        `stem`: whether to stem the tokens
+        `doc_reader`: an already loaded document reader to use instead of
+                      reading the document file
+        `cache_dir`: directory of the parse cache, disabled if None
+        `tokenizer`: tokenizer of the document and query parsers
+        `workers`: number of processes to tokenize the documents with
+
+    Returns:
+        An `IRS` over the collection.
+    """
+    doc_file, query_file, rel_file = COLLECTIONS[collection]
+    data_dir = Path(parent_dir) / collection / "data"
+
+    if doc_reader is None:
+        doc_reader = load_reader_class(collection, "reader")(
+            str(data_dir / doc_file),
+            stem=stem,
+            cache_dir=cache_dir,
+            tokenizer=tokenizer,
+            workers=workers,
+        )
+
+    return IRS(
+        doc_reader,
+        load_reader_class(collection, "query")(
+            str(data_dir / query_file), stem=stem, cache_dir=cache_dir, tokenizer=tokenizer
+        ),
+        load_reader_class(collection, "relevance")(str(data_dir / rel_file)),
+    )
+
+
+# IRS of each (collection, stem) pair, per worker process
+_worker_systems: Dict[Tuple[str, bool], IRS] = {}
+
+
+def _init_worker(
+    shared_paths: Dict[Tuple[str, bool], str],
+    doc_triplets: List[str],
+    cache_dir: str,
+    tokenizer: TokenizerMode,
+):
+    # Queries and judgments are small, they are read again rather than pickled
+    for (collection, stem), shared_path in shared_paths.items():
+        doc_reader = load_reader_class(collection, "reader").from_matrix(
+            Path(parent_dir) / collection / "data" / COLLECTIONS[collection][0],
+            Path(shared_path) / "tf",
+            stem=stem,
+            tokenizer=tokenizer,
+        )
+        irs = load_collection(collection, stem, doc_reader, cache_dir, tokenizer)
+        for doc_triplet in doc_triplets:
+            irs.open_index(WeightingTriplet.from_str(doc_triplet), Path(shared_path) / doc_triplet)
+        _worker_systems[(collection, stem)] = irs
+
+
+def _sweep_unit(
+    key: Tuple[str, bool],
+    doc_triplet: str,
+    query_triplets: List[str],
+    rank_limit: int,
+) -> pd.DataFrame:
+    return _worker_systems[key].sweep([doc_triplet], query_triplets, rank_limit)
+
+
+def run_sweep(
+    collections: List[str],
+    stems: List[bool],
+    doc_triplets: List[str] = WEIGHTINGS,
+    query_triplets: List[str] = WEIGHTINGS,
+    rank_limit: int = 15,
+    workers: int = 1,
+    cache_dir: str = None,
+    tokenizer: TokenizerMode = TokenizerMode.NLTK,
+) -> Dict[Tuple[str, bool], pd.DataFrame]:
+    """
+    Evaluates every weighting pair on every collection. With more than one
+    worker, documents are tokenized in a process pool, then each
+    (collection, stem, document weighting) unit runs in a process pool. Term
+    frequency matrices and weighted indexes are saved to a temporary
+    directory and memory-mapped by the workers instead of being pickled to
+    each one.
+
+    Args:
+        `collections`: collection names, i.e. `adi`
+        `stems`: stemming settings to evaluate each collection with
+        `doc_triplets`: term weighting methods for documents
+        `query_triplets`: term weighting methods for queries
+        `rank_limit`: number of retrieved documents per query
+        `workers`: number of worker processes
+        `cache_dir`: directory of the parse cache, disabled if None
+        `tokenizer`: tokenizer of the document and query parsers
+
+    Returns:
+        The sweep result of each (collection, stem) pair, in the same layout
+        as `IRS.sweep`.
+    """
+    systems = {
+        (collection, stem): load_collection(
+            collection, stem, cache_dir=cache_dir, tokenizer=tokenizer, workers=workers
+        )
+        for collection in collections
+        for stem in stems
+    }
+
+    if workers <= 1:
+        return {
+            key: irs.sweep(doc_triplets, query_triplets, rank_limit)
+            for key, irs in systems.items()
+        }
+
+    with tempfile.TemporaryDirectory(prefix="irs-sweep-") as shared_dir:
+        shared_paths = {}
+        for (collection, stem), irs in systems.items():
+            shared_path = Path(shared_dir) / f"{collection}_{'stem' if stem else 'nostem'}"
+            irs.doc_reader.tf_matrix.save(shared_path / "tf")
+            for doc_triplet in doc_triplets:
+                irs.weight_documents(WeightingTriplet.from_str(doc_triplet)).save(
+                    shared_path / doc_triplet
+                )
+            shared_paths[(collection, stem)] = str(shared_path)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared_paths, doc_triplets, cache_dir, tokenizer),
+        ) as executor:
+            futures = {
+                key: [
+                    executor.submit(_sweep_unit, key, doc_triplet, query_triplets, rank_limit)
+                    for doc_triplet in doc_triplets
+                ]
+                for key in systems
+            }
+
+            # Units are gathered in submission order, whatever order they finish in
+            return {
+                key: pd.concat([future.result() for future in unit_futures], ignore_index=True)
+                for key, unit_futures in futures.items()
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluates the MAP of every weighting pair on the bundled collections."
+    )
+    parser.add_argument(
+        "--collections", nargs="+", choices=list(COLLECTIONS), default=list(COLLECTIONS)
+    )
+    parser.add_argument("--stem", choices=["stem", "nostem", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--rank-limit", type=int, default=15)
+    parser.add_argument("--cache-dir", help="reuse parsed collections stored in this directory")
+    parser.add_argument("--tokenizer", choices=["nltk", "fast"], default="nltk")
+    parser.add_argument("--profile", help="write a Chrome trace of the sweep to this file")
+    parser.add_argument("--trace-memory", action="store_true", help="trace peak memory of each profiled stage")
+    args = parser.parse_args()
+
+    stems = {"stem": [True], "nostem": [False], "both": [True, False]}[args.stem]
+    # Only stages of this process are profiled, not those of the workers
+    profiler = Profiler(trace_memory=args.trace_memory)
+    with profiler if args.profile else nullcontext():
+        results = run_sweep(
+            args.collections,
+            stems,
+            rank_limit=args.rank_limit,
+            workers=args.workers,
+            cache_dir=args.cache_dir,
+            tokenizer=TokenizerMode[args.tokenizer.upper()],
+        )
+
+    if args.profile:
+        profiler.save_chrome_trace(args.profile)
+        print(profiler.report().to_string(), file=sys.stderr)
+        print(f"{args.profile} created succesfully.")
+
+    for (collection, stem), result in results.items():
+        file_path = Path(parent_dir) / collection / f"{collection}_{'stem' if stem else 'nostem'}.csv"
+        result.to_csv(file_path, index=False, lineterminator="\r\n")
+        print(f"{file_path} created succesfully.")
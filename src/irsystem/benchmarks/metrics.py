@@ -0,0 +1,86 @@
+# mac requirements:
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+import argparse
+import time
+from typing import Callable, Dict, List
+from base.choices import WeightingTriplet
+from base.sweep import COLLECTIONS, load_collection
+
+
+def best_time(function: Callable[[], object], repeats: int) -> float:
+    """
+    Runs a function several times.
+
+    Args:
+        `function`: the function to time
+        `repeats`: number of runs
+
+    Returns:
+        The fastest run, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(collection: str, weighting: str, rank_limit: int, cutoffs: List[int], repeats: int) -> Dict[str, float]:
+    """
+    Times ranking the queries of a collection, then evaluating the ranking
+    with MAP alone and with every measure of `Qrels.metrics`.
+
+    Args:
+        `collection`: collection name, i.e. `adi`
+        `weighting`: the `doc.query` weighting pair, i.e. `lnc.ltc`
+        `rank_limit`: number of retrieved documents per query
+        `cutoffs`: the ranks precision, recall and nDCG are measured at
+        `repeats`: number of runs, the fastest is kept
+
+    Returns:
+        The seconds each step took and the number of measures.
+    """
+    irs = load_collection(collection, True)
+    doc_weighting, query_weighting = (
+        WeightingTriplet.from_str(triplet) for triplet in weighting.split(".")
+    )
+
+    # Weighting is cached by the IRS, only the ranking itself is timed
+    ranking = irs.rank(doc_weighting, query_weighting, rank_limit)
+    qrels = irs.qrels()
+
+    return {
+        "rank": best_time(lambda: irs.rank(doc_weighting, query_weighting, rank_limit), repeats),
+        "map": best_time(lambda: qrels.mean_average_precision(ranking.doc_numbers), repeats),
+        "metrics": best_time(lambda: qrels.metrics(ranking.doc_numbers, cutoffs), repeats),
+        "measures": len(qrels.metrics(ranking.doc_numbers, cutoffs).columns),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares the cost of the full metric suite to MAP alone and to ranking."
+    )
+    parser.add_argument(
+        "--collections", nargs="+", choices=list(COLLECTIONS), default=list(COLLECTIONS)
+    )
+    parser.add_argument("--weighting", default="lnc.ltc")
+    parser.add_argument("--rank-limit", type=int, default=100)
+    parser.add_argument("--cutoffs", nargs="+", type=int, default=[5, 10, 15, 20, 30, 100])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for collection in args.collections:
+        result = measure(collection, args.weighting, args.rank_limit, args.cutoffs, args.repeats)
+        print(
+            f"{collection}: rank {result['rank'] * 1000:.2f}ms, "
+            f"map {result['map'] * 1000:.2f}ms, "
+            f"{result['measures']} measures {result['metrics'] * 1000:.2f}ms"
+        )
@@ -0,0 +1,247 @@
+# mac requirements:
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+import numpy as np
+import scipy
+from base import profiling
+from base.choices import TokenizerMode, WeightingTriplet
+from base.converter import Converter
+from base.evaluation import Qrels
+from base.irs import IRS
+from base.profiling import Profiler
+from base.scorer import Scorer
+from base.sweep import COLLECTIONS, WEIGHTINGS, load_reader_class
+
+
+RESULT_FORMAT = 1
+"""
+Version of the JSON result layout written by this script.
+"""
+
+STAGES = [
+    "get_docs",
+    "parse_docs",
+    "build_doc_stats",
+    "parse_queries",
+    "weight_queries",
+    "convert",
+    "invert",
+    "score",
+    "map",
+]
+"""
+Pipeline stages timed for every collection, in pipeline order.
+"""
+
+
+def run_collection(
+    collection: str,
+    stem: bool,
+    tokenizer: str,
+    weightings: List[str],
+    rank_limit: int,
+) -> Dict[str, Any]:
+    """
+    Runs the pipeline of a collection under a `Profiler`, each stage timed
+    by its span. Reading and parsing run once. Every document weighting is
+    converted and inverted, then scored and evaluated against the queries
+    weighted the same way.
+
+    Args:
+        `collection`: collection name, i.e. `adi`
+        `stem`: whether to stem the tokens
+        `tokenizer`: tokenizer mode name, i.e. `nltk`
+        `weightings`: weighting triplets to run, i.e. `ltc`
+        `rank_limit`: number of retrieved documents per query
+
+    Returns:
+        The collection sizes, the seconds of each stage, summed over the
+        weightings, and the peak resident set size of the process.
+    """
+    doc_file, query_file, rel_file = COLLECTIONS[collection]
+    data_dir = Path(parent_dir) / collection / "data"
+    tokenizer = TokenizerMode[tokenizer.upper()]
+
+    # The reader, converter and IRS open spans for their own stages, the
+    # other stages are spanned here
+    profiler = Profiler()
+    with profiler:
+        doc_reader = load_reader_class(collection, "reader")(
+            str(data_dir / doc_file), stem=stem, tokenizer=tokenizer
+        )
+        with profiling.span("parse_queries"):
+            query_reader = load_reader_class(collection, "query")(
+                str(data_dir / query_file), stem=stem, tokenizer=tokenizer
+            )
+        relevance_reader = load_reader_class(collection, "relevance")(str(data_dir / rel_file))
+
+        # The IRS of the collection weights the queries, documents are weighted directly
+        irs = IRS(doc_reader, query_reader, relevance_reader)
+        qrels = Qrels(
+            relevance_reader,
+            [query["query_id"] for query in query_reader.queries],
+            doc_reader.tf_matrix.doc_ids,
+        )
+
+        for triplet in weightings:
+            weighting = WeightingTriplet.from_str(triplet)
+            term_weight = Converter.convert(doc_reader.tf_matrix, weighting.tf, weighting.idf, weighting.norm)
+            inverted_index = Converter.invert(term_weight)
+            _, query_matrix = irs.weight_queries(weighting)
+
+            with profiling.span("score"):
+                scorer = Scorer.choose(query_matrix, inverted_index)
+                ranking = scorer.top_k(query_matrix, inverted_index, rank_limit)
+            with profiling.span("map"):
+                qrels.mean_average_precision(ranking.doc_numbers)
+
+    wall_seconds = profiler.report()["wall_seconds"]
+    seconds = {stage: float(wall_seconds.get(stage, 0.0)) for stage in STAGES}
+
+    return {
+        "documents": len(doc_reader.tf_matrix),
+        "terms": len(doc_reader.tf_matrix.terms),
+        "postings": int(doc_reader.tf_matrix.matrix.nnz),
+        "queries": len(query_reader.queries),
+        "weightings": len(weightings),
+        "seconds": seconds,
+        "total_seconds": sum(seconds.values()),
+        # Linux reports kibibytes, macOS bytes
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        // (1024 if sys.platform == "darwin" else 1),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Describes the code and machine a benchmark ran on.
+
+    Returns:
+        A JSON-serializable dictionary.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=parent_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def regressions(
+    result: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    min_seconds: float = 0.01,
+) -> List[str]:
+    """
+    Compares two benchmark results stage by stage.
+
+    Args:
+        `result`: the new result
+        `baseline`: the result to compare against
+        `tolerance`: allowed slowdown, i.e. 0.2 for 20%
+        `min_seconds`: slowdowns of fewer seconds are timer noise, not regressions
+
+    Returns:
+        A line for every stage or peak memory of a collection in both
+        results that grew by more than the tolerance.
+    """
+    found = []
+    for collection, measured in result["collections"].items():
+        before = baseline["collections"].get(collection)
+        if before is None:
+            continue
+
+        pairs = [
+            (stage, measured["seconds"][stage], before["seconds"].get(stage), min_seconds)
+            for stage in STAGES
+        ]
+        pairs.append(("peak_rss_kib", measured["peak_rss_kib"], before.get("peak_rss_kib"), 0))
+        for name, value, previous, noise in pairs:
+            if previous and value > previous * (1 + tolerance) and value - previous > noise:
+                found.append(f"{collection} {name}: {previous:.4g} -> {value:.4g} (+{value / previous - 1:.0%})")
+
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Times every stage of the retrieval pipeline on the bundled collections."
+    )
+    parser.add_argument(
+        "--collections", nargs="+", choices=list(COLLECTIONS), default=list(COLLECTIONS)
+    )
+    parser.add_argument("--stem", choices=["stem", "nostem"], default="stem")
+    parser.add_argument("--tokenizer", choices=["nltk", "fast"], default="nltk")
+    parser.add_argument("--weightings", nargs="+", default=WEIGHTINGS)
+    parser.add_argument("--rank-limit", type=int, default=15)
+    parser.add_argument("--output", help="write the JSON result to this file instead of stdout")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="smallest slowdown reported")
+    args = parser.parse_args()
+
+    # A fresh process per collection, so peak memory is the collection's own
+    context = multiprocessing.get_context("spawn")
+    collections = {}
+    for collection in args.collections:
+        with context.Pool(1) as pool:
+            collections[collection] = pool.apply(
+                run_collection,
+                (collection, args.stem == "stem", args.tokenizer, args.weightings, args.rank_limit),
+            )
+        print(
+            f"{collection}: {collections[collection]['total_seconds']:.2f}s, "
+            f"peak {collections[collection]['peak_rss_kib'] / 1024:.1f} MiB",
+            file=sys.stderr,
+        )
+
+    result = {
+        "format": RESULT_FORMAT,
+        "environment": environment(),
+        "settings": {
+            "stem": args.stem == "stem",
+            "tokenizer": args.tokenizer,
+            "weightings": args.weightings,
+            "rank_limit": args.rank_limit,
+        },
+        "collections": collections,
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        found = regressions(
+            result, json.loads(Path(args.baseline).read_text()), args.tolerance, args.min_seconds
+        )
+        for line in found:
+            print(f"regression: {line}", file=sys.stderr)
+        sys.exit(1 if found else 0)
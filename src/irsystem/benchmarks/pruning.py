@@ -0,0 +1,79 @@
+# mac requirements:
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+import argparse
+import time
+from typing import Any, Dict
+import numpy as np
+from base.choices import WeightingTriplet
+from base.irs import IRS
+from base.scorer import MaxScoreScorer, Scorer, TermAtATimeScorer
+from base.sweep import COLLECTIONS, load_collection
+
+
+def measure(scorer: Scorer, irs: IRS, doc_weighting: str, query_weighting: str, k: int) -> Dict[str, Any]:
+    """
+    Retrieves the top documents of every query of a collection with a scorer.
+
+    Args:
+        `scorer`: the scorer to measure
+        `irs`: the loaded collection
+        `doc_weighting`: document weighting triplet, i.e. `lnc`
+        `query_weighting`: query weighting triplet, i.e. `ltc`
+        `k`: number of documents to retrieve per query
+
+    Returns:
+        The ranking, the postings the scorer read and the time it took.
+    """
+    inverted_index = irs.weight_documents(WeightingTriplet.from_str(doc_weighting))
+    inverted_index.max_weights()
+    _, query_matrix = irs.weight_queries(WeightingTriplet.from_str(query_weighting))
+
+    start = time.perf_counter()
+    ranking = scorer.top_k(query_matrix, inverted_index, k)
+    seconds = time.perf_counter() - start
+
+    return {"ranking": ranking, "postings": scorer.postings_visited, "seconds": seconds}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares MaxScore pruning to exhaustive term-at-a-time scoring."
+    )
+    parser.add_argument(
+        "--collections", nargs="+", choices=list(COLLECTIONS), default=["npl", "cacm"]
+    )
+    parser.add_argument("--weightings", nargs="+", default=["lnc.ltc", "ntc.ntc", "atn.atn", "bnn.btn"])
+    parser.add_argument("--rank-limits", nargs="+", type=int, default=[10, 15, 100])
+    args = parser.parse_args()
+
+    identical = True
+    for collection in args.collections:
+        irs = load_collection(collection, True)
+        print(f"{collection}: {len(irs.doc_reader.tf_matrix)} documents")
+
+        for weighting in args.weightings:
+            doc_weighting, query_weighting = weighting.split(".")
+            for k in args.rank_limits:
+                exhaustive = measure(TermAtATimeScorer(), irs, doc_weighting, query_weighting, k)
+                pruned = measure(MaxScoreScorer(), irs, doc_weighting, query_weighting, k)
+
+                same = np.array_equal(
+                    exhaustive["ranking"].doc_ids, pruned["ranking"].doc_ids
+                ) and np.allclose(exhaustive["ranking"].scores, pruned["ranking"].scores)
+                identical = identical and same
+
+                print(
+                    f"  {weighting} k={k}: postings {pruned['postings']}/{exhaustive['postings']} "
+                    f"({pruned['postings'] / exhaustive['postings']:.0%}), "
+                    f"exhaustive {exhaustive['seconds'] * 1000:.1f}ms, "
+                    f"maxscore {pruned['seconds'] * 1000:.1f}ms, "
+                    f"{'identical' if same else 'DIFFERENT'} top {k}"
+                )
+
+    sys.exit(0 if identical else 1)
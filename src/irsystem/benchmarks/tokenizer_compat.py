@@ -0,0 +1,106 @@
+# mac requirements:
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+import argparse
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from base.choices import TokenizerMode
+from base.sweep import COLLECTIONS, load_reader_class
+
+
+def collection_tokens(collection: str, tokenizer: TokenizerMode) -> Tuple[List[List[str]], float]:
+    """
+    Reads the documents and queries of a bundled collection with their
+    readers, unstemmed.
+
+    Args:
+        `collection`: collection name, i.e. `adi`
+        `tokenizer`: the tokenizer of both readers
+
+    Returns:
+        The tokens of every document, then of every query, and the seconds
+        the readers took.
+    """
+    doc_file, query_file, _ = COLLECTIONS[collection]
+    data_dir = Path(parent_dir) / collection / "data"
+
+    start = time.perf_counter()
+    doc_reader = load_reader_class(collection, "reader")(
+        str(data_dir / doc_file), stem=False, tokenizer=tokenizer
+    )
+    query_reader = load_reader_class(collection, "query")(
+        str(data_dir / query_file), stem=False, tokenizer=tokenizer
+    )
+    seconds = time.perf_counter() - start
+
+    return doc_reader.store.token_lists() + [query["tokens"] for query in query_reader.queries], seconds
+
+
+def compare(collection: str) -> Dict[str, Any]:
+    """
+    Reads a collection with both tokenizers and compares the results token
+    for token.
+
+    Args:
+        `collection`: collection name, i.e. `adi`
+
+    Returns:
+        Text and token counts, the number of texts tokenized identically, the
+        tokens only one tokenizer produced and the time each reading took.
+    """
+    nltk_tokens, nltk_seconds = collection_tokens(collection, TokenizerMode.NLTK)
+    fast_tokens, fast_seconds = collection_tokens(collection, TokenizerMode.FAST)
+
+    only_nltk, only_fast = Counter(), Counter()
+    for expected, actual in zip(nltk_tokens, fast_tokens):
+        if expected != actual:
+            only_nltk.update(Counter(expected) - Counter(actual))
+            only_fast.update(Counter(actual) - Counter(expected))
+
+    return {
+        "texts": len(nltk_tokens),
+        "identical": sum(expected == actual for expected, actual in zip(nltk_tokens, fast_tokens)),
+        "tokens": sum(len(tokens) for tokens in nltk_tokens),
+        "only_nltk": only_nltk,
+        "only_fast": only_fast,
+        "nltk_seconds": nltk_seconds,
+        "fast_seconds": fast_seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares the fast tokenizer to nltk.word_tokenize on the bundled collections."
+    )
+    parser.add_argument(
+        "--collections", nargs="+", choices=list(COLLECTIONS), default=list(COLLECTIONS)
+    )
+    parser.add_argument("--examples", type=int, default=5, help="differing tokens to list")
+    args = parser.parse_args()
+
+    agree = True
+    for collection in args.collections:
+        result = compare(collection)
+        differing = sum(result["only_nltk"].values()) + sum(result["only_fast"].values())
+        agree = agree and differing == 0
+
+        print(
+            f"{collection}: {result['identical']}/{result['texts']} texts identical, "
+            f"{differing} differing of {result['tokens']} tokens, "
+            f"nltk {result['nltk_seconds']:.2f}s, fast {result['fast_seconds']:.2f}s"
+        )
+        for label in ("only_nltk", "only_fast"):
+            if result[label]:
+                examples = ", ".join(
+                    f"{token!r} x{count}" for token, count in result[label].most_common(args.examples)
+                )
+                print(f"  {label}: {examples}")
+
+    sys.exit(0 if agree else 1)
@@ -1,38 +1,16 @@
 from base import BaseQueryReader
+from base.smart import iter_smart_records
 
 class CacmQueryReader(BaseQueryReader):
     def get_queries(self):
-        queries = []
-        with open(self.file_path, "r") as f:
-            # Get whole sections delimited by ".I"
-            sections = f.read().split(".I")[1:]
+        return [
+            {
+                "query_id": record.id,
+                "query": " ".join(line.strip() for line in record.fields.get("W", [])),
+            }
+            for record in iter_smart_records(self.file_path, "WAN")
+        ]
 
-            for section in sections:
-                # Get the query_id
-                query_id = int(section.split()[0])
-                lines = section.strip().split('\n')
-                
-                # Find the index of '.W'
-                content_start_index = lines.index('.W') + 1
-                
-                # Join lines of content until the next section delimiter
-                content_lines = []
-                for line in lines[content_start_index:]:
-                    if line.startswith('.I') or line.startswith('.A') or line.startswith('.N'):  # Check for the start of the next section
-                        break
-                    content_lines.append(line.strip())
-                
-                # Extract the content
-                query = " ".join(content_lines)
-
-                queries.append(
-                    {
-                        "query_id": query_id,
-                        "query": query
-                    }
-                )
-
-        return queries
 
 if __name__ == "__main__":
     import os
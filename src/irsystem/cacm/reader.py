@@ -1,42 +1,22 @@
 from base import BaseDocReader
+from base.smart import iter_smart_records
 
 
 class CacmDocReader(BaseDocReader):
-    def get_docs(self):
-        docs = []
-        doc = {}
-        key = None
-        with open(self.file_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith(".I"):
-                    if doc:
-                        docs.append(doc)
-                    doc = {
-                        "doc_id": int(line.split()[1]),
-                        "title": "",
-                        "author": "",
-                        "bibliography": "",
-                        "content": "",
-                    }
-                    key = None
-                elif line.startswith(".T"):
-                    key = "title"
-                elif line.startswith(".A"):
-                    key = "author"
-                elif line.startswith(".B"):
-                    key = "bibliography"
-                elif line.startswith(".W"):
-                    key = "content"
-                elif line.startswith((".N", ".X", ".I")):
-                    key = None
-                elif key:
-                    doc[key] += line + " "
-
-            if doc:
-                docs.append(doc)
-
-        return docs
+    def iter_docs(self):
+        # Unlisted markers, i.e. ".K" keywords, are read as text of the current field
+        for record in iter_smart_records(self.file_path, "TABWNX"):
+            yield {
+                "doc_id": record.id,
+                "title": self.join_lines(record, "T"),
+                "author": self.join_lines(record, "A"),
+                "bibliography": self.join_lines(record, "B"),
+                "content": self.join_lines(record, "W"),
+            }
+
+    @staticmethod
+    def join_lines(record, field):
+        return "".join(line.strip() + " " for line in record.fields.get(field, []))
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 from base import BaseQueryReader
+from base.smart import iter_smart_records
 
 class CranQueryReader(BaseQueryReader):
     def get_queries(self):
@@ -21,30 +22,17 @@ class CranQueryReader(BaseQueryReader):
         ]
         """
 
-        queries = []
-        with open(self.file_path, "r") as f:
-            count = 1
-            # Get whole sections delimited by ".I"
-            sections = f.read().split(".I")[1:]
-
-            for section in sections:
-                # Get the query_id
-                # NOTE: query_id uses count
-                # query_id = int(section.split()[0])
-                query_id = count
-                count += 1
-
-                # Get the query
-                query = section.split(".W")[1].strip().replace("\n", " ")
-
-                queries.append(
-                    {
-                        "query_id": query_id,
-                        "query": query
-                    }
-                )
-
-        return queries
+        # NOTE: query_id uses the position of the query, not its ".I" number
+        return [
+            {
+                "query_id": count,
+                "query": record.text("W", "").strip().replace("\n", " "),
+            }
+            for count, record in enumerate(
+                iter_smart_records(self.file_path, "W", open_field="W"), start=1
+            )
+        ]
+
 
 if __name__ == "__main__":
     import os
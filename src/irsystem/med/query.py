@@ -1,27 +1,16 @@
 from base import BaseQueryReader
+from base.smart import iter_smart_records
 
 class MedQueryReader(BaseQueryReader):
     def get_queries(self):
-        queries = []
-        with open(self.file_path, "r") as f:
-            # Get whole sections delimited by ".I"
-            sections = f.read().split(".I")[1:]
+        return [
+            {
+                "query_id": record.id,
+                "query": record.text("W", "").strip().replace("\n", " "),
+            }
+            for record in iter_smart_records(self.file_path, "W", open_field="W")
+        ]
 
-            for section in sections:
-                # Get the query_id
-                query_id = int(section.split()[0])
-
-                # Get the query
-                query = section.split(".W")[1].strip().replace("\n", " ")
-
-                queries.append(
-                    {
-                        "query_id": query_id,
-                        "query": query
-                    }
-                )
-
-        return queries
 
 if __name__ == "__main__":
     import os
@@ -1,40 +1,22 @@
 from base import BaseDocReader
+from base.smart import iter_smart_records
 
 
 class MedDocReader(BaseDocReader):
-    def get_docs(self):
-        docs = []
-        with open(self.file_path, "r") as f:
-            # Get whole sections delimited by ".I"
-            sections = f.read().split(".I")[1:]
-
-            for section in sections:
-                # Get the doc_id
-                doc_id = int(section.split()[0])
-
-                # Get the content
-                content = section.split(".W")[1].strip()
-
-                lines = content.split("\n")
-
-                processed_lines = []
-                for line in lines:
-                    # Strip leading/trailing whitespace and replace tabs with spaces
-                    clean_line = line.strip().replace("\t", " ")
-
-                    if clean_line:
-                        processed_lines.append(clean_line)
-
-                final_content = ' '.join(processed_lines)
-
-                docs.append(
-                    {
-                        "doc_id": doc_id,
-                        "content": final_content,
-                    }
-                )
-
-        return docs
+    def iter_docs(self):
+        for record in iter_smart_records(self.file_path, "W", open_field="W"):
+            processed_lines = []
+            for line in record.fields.get("W", []):
+                # Strip leading/trailing whitespace and replace tabs with spaces
+                clean_line = line.strip().replace("\t", " ")
+
+                if clean_line:
+                    processed_lines.append(clean_line)
+
+            yield {
+                "doc_id": record.id,
+                "content": " ".join(processed_lines),
+            }
 
 
 if __name__ == "__main__":
@@ -2,44 +2,27 @@ from base import BaseDocReader
 
 
 class NplDocReader(BaseDocReader):
-    def get_docs(self):
-        docs = []
+    def iter_docs(self):
+        doc_id = None
+        content = []
         with open(self.file_path, "r") as f:
-            lines = f.readlines()
-
-            doc_id = None
-            content = []
-
-            index = 0
-            while True:
-                line = lines[index]
-                doc_id = int(line)
-
-                while True:
-                    index += 1
-                    line = lines[index].strip()
-
-                    if line.strip() == "/":
-                        break
-
-                    content.append(line)
-
-                content = " ".join(content).strip()
-                docs.append(
-                    {
+            for line in f:
+                line = line.strip()
+
+                # A document is its ID line, then content lines up to "/"
+                if doc_id is None:
+                    if line:
+                        doc_id = int(line)
+                elif line == "/":
+                    yield {
                         "doc_id": doc_id,
-                        "content": content,
+                        "content": " ".join(content).strip(),
                     }
-                )
-
-                doc_id = None
-                content = []
 
-                index += 1
-                if index >= len(lines):
-                    break
-
-        return docs
+                    doc_id = None
+                    content = []
+                else:
+                    content.append(line)
 
 
 if __name__ == "__main__":
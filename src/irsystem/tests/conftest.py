@@ -0,0 +1,49 @@
+# mac requirements:
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+sys.path.append(parent_dir)
+
+from functools import partial
+from pathlib import Path
+from typing import Callable
+import pytest
+from base.choices import TokenizerMode
+from base.reader import BaseDocReader
+from base.sweep import COLLECTIONS, load_reader_class
+
+
+def read_collection(collection: str, **kwargs) -> BaseDocReader:
+    """
+    Reads the documents of a bundled collection, with the fast tokenizer
+    unless another one is given.
+
+    Args:
+        `collection`: collection name, i.e. `adi`
+        `kwargs`: other arguments of the reader
+
+    Returns:
+        The document reader.
+    """
+    doc_file = COLLECTIONS[collection][0]
+    reader_class = load_reader_class(collection, "reader")
+    kwargs.setdefault("tokenizer", TokenizerMode.FAST)
+    return reader_class(str(Path(parent_dir) / collection / "data" / doc_file), **kwargs)
+
+
+@pytest.fixture
+def adi_reader() -> BaseDocReader:
+    """
+    The ADI documents, read again for every test since tests change them.
+    """
+    return read_collection("adi")
+
+
+@pytest.fixture
+def read_adi() -> Callable[..., BaseDocReader]:
+    """
+    Reads the ADI documents with other reader arguments, see `read_collection`.
+    """
+    return partial(read_collection, "adi")
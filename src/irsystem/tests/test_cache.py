@@ -0,0 +1,28 @@
+import pytest
+from base.choices import TokenizerMode
+from base.reader import BaseDocReader
+
+
+def cache_entries(cache_dir):
+    return sorted(cache_dir.glob("*.npz"))
+
+
+@pytest.mark.parametrize("settings", [{"stem": False}, {"tokenizer": TokenizerMode.NLTK}])
+def test_parse_settings_invalidate_cache_entry(read_adi, tmp_path, monkeypatch, settings):
+    read_adi(cache_dir=tmp_path)
+    assert len(cache_entries(tmp_path)) == 1
+
+    # Other settings miss the entry and parse again
+    reader = read_adi(cache_dir=tmp_path, **settings)
+    assert len(cache_entries(tmp_path)) == 2
+    expected = read_adi(**settings).tf_matrix
+    assert reader.tf_matrix.terms == expected.terms
+    assert (reader.tf_matrix.matrix != expected.matrix).nnz == 0
+
+    # The same settings load their own entry without parsing
+    def parse_docs(*args):
+        raise AssertionError("cached documents parsed again")
+
+    monkeypatch.setattr(BaseDocReader, "parse_docs", parse_docs)
+    cached = read_adi(cache_dir=tmp_path, **settings)
+    assert cached.tf_matrix.terms == expected.terms
@@ -0,0 +1,48 @@
+from typing import Dict
+import pytest
+from base.choices import IDFMode, NormMode, TokenizerMode, WeightingTriplet
+from base.converter import Converter
+from base.sweep import WEIGHTINGS, load_collection
+
+
+@pytest.fixture(scope="module")
+def adi_irs():
+    return load_collection("adi", True, tokenizer=TokenizerMode.FAST)
+
+
+def dict_weights(tokens, query_weighting: WeightingTriplet, term_idfs: Dict[str, float]) -> Dict[str, float]:
+    # The per-query dictionaries IRS.eval used to build, terms missing from
+    # the vocabulary included
+    term_weights = Converter.calc_term_frequency(tokens, query_weighting.tf)
+    if query_weighting.idf == IDFMode.T:
+        term_weights = {term: tf * term_idfs.get(term, 0) for term, tf in term_weights.items()}
+    if query_weighting.norm == NormMode.C:
+        term_weights = Converter.normalize(term_weights)
+    return term_weights
+
+
+@pytest.mark.parametrize("triplet", WEIGHTINGS)
+def test_matrix_matches_per_query_weights(adi_irs, triplet):
+    query_weighting = WeightingTriplet.from_str(triplet)
+    terms = adi_irs.doc_reader.tf_matrix.terms
+    term_idfs = adi_irs.doc_reader.get_term_idfs()
+    query_matrix = adi_irs.compiled_queries().matrix(query_weighting)
+
+    checked = 0
+    for row, query in enumerate(adi_irs.query_reader.queries):
+        # Weighted to nothing, the dictionaries can't be normalized
+        if query_weighting.idf == IDFMode.T and not any(term in term_idfs for term in query["tokens"]):
+            continue
+
+        expected = dict_weights(query["tokens"], query_weighting, term_idfs)
+        expected = {term: weight for term, weight in expected.items() if term in term_idfs and weight}
+        start, end = query_matrix.indptr[row], query_matrix.indptr[row + 1]
+        actual = {
+            terms[col]: weight
+            for col, weight in zip(query_matrix.indices[start:end].tolist(), query_matrix.data[start:end].tolist())
+            if weight
+        }
+        assert actual.keys() == expected.keys()
+        assert all(actual[term] == pytest.approx(weight, rel=1e-12) for term, weight in expected.items())
+        checked += 1
+    assert checked > 0
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from base.choices import TokenizerMode
+from base.matrix import TermDocMatrix
+
+
+def assert_same_matrix(actual: TermDocMatrix, expected: TermDocMatrix):
+    assert actual.terms == expected.terms
+    assert list(actual.doc_ids) == list(expected.doc_ids)
+    assert (actual.matrix != expected.matrix).nnz == 0
+    assert np.array_equal(actual.doc_lengths, expected.doc_lengths)
+    assert np.array_equal(actual.document_frequencies(), expected.document_frequencies())
+
+
+def test_remove_documents_matches_rebuild(adi_reader):
+    reader = adi_reader
+    token_lists = dict(zip(reader.tf_matrix.doc_ids, reader.store.token_lists()))
+    reader.tf_matrix.document_frequencies()
+
+    removed = list(reader.tf_matrix.doc_ids[::7])
+    reader.remove_documents(removed)
+
+    kept = [doc_id for doc_id in token_lists if doc_id not in removed]
+    rebuilt = TermDocMatrix.from_token_stream((doc_id, token_lists[doc_id]) for doc_id in kept)
+    assert_same_matrix(reader.tf_matrix, rebuilt)
+    assert reader.store.terms == rebuilt.terms
+    assert_same_matrix(reader.store.to_matrix(), rebuilt)
+
+
+def test_remove_documents_rejects_duplicate_ids(adi_reader):
+    reader = adi_reader
+    doc_count = len(reader.tf_matrix)
+    doc_id = reader.tf_matrix.doc_ids[4]
+
+    with pytest.raises(Exception):
+        reader.remove_documents([doc_id, doc_id])
+    assert len(reader.tf_matrix) == doc_count
+    assert len(reader.store) == doc_count
+
+
+def test_drop_counts_duplicate_ids_once(adi_reader):
+    tf_matrix = adi_reader.tf_matrix
+    tf_matrix.document_frequencies()
+    doc_id = tf_matrix.doc_ids[4]
+
+    assert_same_matrix(tf_matrix.drop([doc_id, doc_id]), tf_matrix.drop([doc_id]))
+    assert (tf_matrix.drop([doc_id, doc_id]).document_frequencies() > 0).all()
+
+
+def test_from_matrix_reader_supports_reader_methods(adi_reader, tmp_path):
+    adi_reader.tf_matrix.save(tmp_path)
+    reader = type(adi_reader).from_matrix(adi_reader.file_path, tmp_path, tokenizer=TokenizerMode.FAST)
+    assert_same_matrix(reader.tf_matrix, adi_reader.tf_matrix)
+    assert reader.word_set == adi_reader.word_set
+    assert reader.docs == []
+
+    doc = {"doc_id": 999, "title": "zebra", "content": "zebra retrieval of zebra documents"}
+    reader.add_documents([doc])
+    adi_reader.add_documents([doc])
+    assert_same_matrix(reader.tf_matrix, adi_reader.tf_matrix)
+
+    reader.remove_documents([999])
+    assert len(reader.tf_matrix) == len(adi_reader.tf_matrix) - 1
+
+
+@pytest.mark.parametrize("stem", [True, False])
+def test_streamed_documents_match_read_documents(read_adi, stem):
+    streamed = read_adi(stem=stem, stream=True)
+    assert_same_matrix(streamed.tf_matrix, read_adi(stem=stem).tf_matrix)
+    assert streamed.store is None
+    assert streamed.docs == []
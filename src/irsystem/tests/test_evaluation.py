@@ -0,0 +1,29 @@
+from pathlib import Path
+import numpy as np
+import pytest
+from base.evaluation import Qrels
+from base.sweep import load_reader_class
+
+
+def test_metrics_match_hand_computed_query(adi_reader):
+    rel_path = Path(__file__).resolve().parents[1] / "adi" / "data" / "adi.rel"
+    relevance_reader = load_reader_class("adi", "relevance")(str(rel_path))
+    doc_ids = np.asarray(adi_reader.tf_matrix.doc_ids)
+    qrels = Qrels(relevance_reader, [3], doc_ids)
+
+    # Query 3 has relevant documents 3, 43, 45 and 60, three of them ranked
+    # 1st, 3rd and 6th, document 3 not retrieved
+    ranked = [43, 1, 60, 2, 4, 45, 5, 6]
+    numbers = {doc_id: number for number, doc_id in enumerate(doc_ids.tolist())}
+    metrics = qrels.metrics(np.array([[numbers[doc_id] for doc_id in ranked]]), cutoffs=(5,))
+    row = metrics.loc[3]
+
+    assert row["P_5"] == pytest.approx(2 / 5)
+    assert row["recall_5"] == pytest.approx(2 / 4)
+    assert row["Rprec"] == pytest.approx(2 / 4)
+    assert row["recip_rank"] == pytest.approx(1.0)
+    assert row["map"] == pytest.approx((1 / 1 + 2 / 3 + 3 / 6) / 4)
+
+    dcg = 1 / np.log2(2) + 1 / np.log2(4)
+    ideal_dcg = 1 / np.log2(2) + 1 / np.log2(3) + 1 / np.log2(4) + 1 / np.log2(5)
+    assert row["ndcg_cut_5"] == pytest.approx(dcg / ideal_dcg)
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from base.choices import TokenizerMode, WeightingTriplet
+from base.sweep import load_collection
+
+
+def test_open_index_scores_like_computed_index(tmp_path):
+    irs = load_collection("adi", True, tokenizer=TokenizerMode.FAST)
+    weighting = WeightingTriplet.from_str("lnc")
+    irs.weight_documents(weighting).save(tmp_path)
+
+    opened = load_collection("adi", True, doc_reader=irs.doc_reader, tokenizer=TokenizerMode.FAST)
+    opened.open_index(weighting, tmp_path)
+    assert np.array_equal(
+        opened.rank(weighting, weighting).doc_ids, irs.rank(weighting, weighting).doc_ids
+    )
+
+
+def test_open_index_rejects_other_collection(tmp_path):
+    irs = load_collection("adi", True, tokenizer=TokenizerMode.FAST)
+    weighting = WeightingTriplet.from_str("lnc")
+    irs.weight_documents(weighting).save(tmp_path)
+
+    irs.remove_documents([irs.doc_reader.tf_matrix.doc_ids[0]])
+    with pytest.raises(Exception):
+        irs.open_index(weighting, tmp_path)
@@ -0,0 +1,18 @@
+import numpy as np
+from base.ranking import Ranking
+
+
+def test_top_k_breaks_rounding_ties_by_ascending_doc_id():
+    # 0.1 + 0.2 is 0.30000000000000004, the same score summed in another order
+    scores = np.array([[0.3, 0.1 + 0.2, 0.5, 0.1], [0.1 + 0.2, 0.3, 0.5, 0.1]])
+    doc_ids = np.array([7, 3, 9, 1])
+
+    ranking = Ranking.top_k(scores, doc_ids, 3)
+    assert ranking.doc_ids.tolist() == [[9, 3, 7], [9, 3, 7]]
+    assert Ranking.top_k(scores, doc_ids, 2).doc_ids.tolist() == [[9, 3], [9, 3]]
+
+
+def test_top_k_keeps_every_document_when_k_exceeds_them():
+    ranking = Ranking.top_k(np.array([[0.2, 0.0, 0.2]]), np.array([5, 4, 2]), 10)
+    assert ranking.doc_ids.tolist() == [[2, 5, 4]]
+    assert ranking.doc_numbers.tolist() == [[2, 0, 1]]
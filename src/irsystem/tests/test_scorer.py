@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from base.choices import IDFMode, NormMode, TFMode, TokenizerMode, WeightingTriplet
+from base.converter import Converter
+from base.index import InvertedIndex
+from base.matrix import TermDocMatrix
+from base.ranking import Ranking
+from base.scorer import MATRIX_SETUP_TERMS, MatrixScorer, MaxScoreScorer, Scorer, TermAtATimeScorer
+from base.sweep import load_collection
+
+
+def dense_index(docs: int, terms: int) -> InvertedIndex:
+    # Every document holds every term once
+    matrix = sparse.csr_matrix(np.ones((docs, terms)))
+    return InvertedIndex.from_matrix(
+        TermDocMatrix(matrix, [f"t{col:03}" for col in range(terms)], list(range(docs)))
+    )
+
+
+def query(terms: int) -> sparse.csr_matrix:
+    # A single query holding the first terms of `dense_index`
+    return sparse.csr_matrix((np.ones(terms), np.arange(terms), [0, terms]), shape=(1, 100))
+
+
+def test_matrix_product_matches_term_at_a_time(adi_reader):
+    tf_matrix = adi_reader.tf_matrix
+    inverted_index = InvertedIndex.from_matrix(Converter.convert(tf_matrix, TFMode.L, IDFMode.T, NormMode.C))
+    query_matrix = sparse.random(20, len(tf_matrix.terms), density=0.01, format="csr", random_state=1)
+
+    matrix = MatrixScorer()
+    taat = TermAtATimeScorer()
+    assert np.allclose(matrix.score(query_matrix, inverted_index), taat.score(query_matrix, inverted_index))
+    assert matrix.postings_visited == taat.postings_visited
+
+
+def test_choose_short_query_term_at_a_time():
+    assert type(Scorer.choose(query(MATRIX_SETUP_TERMS), dense_index(10, 100))) is TermAtATimeScorer
+
+
+def test_choose_long_query_matrix_product():
+    assert type(Scorer.choose(query(MATRIX_SETUP_TERMS + 1), dense_index(10, 100))) is MatrixScorer
+
+
+def test_choose_long_postings_term_at_a_time():
+    # 30 terms of 1000 postings allow 30 terms more
+    assert type(Scorer.choose(query(MATRIX_SETUP_TERMS + 6), dense_index(1000, 100))) is TermAtATimeScorer
+
+
+def assert_same_ranking(actual: Ranking, expected: Ranking):
+    assert np.array_equal(actual.doc_ids, expected.doc_ids)
+    assert np.allclose(actual.scores, expected.scores)
+
+
+@pytest.mark.parametrize("triplets", ["lnc.ltc", "atn.atn", "nnn.nnn"])
+@pytest.mark.parametrize("k", [1, 5, 15])
+def test_max_score_matches_exhaustive_ranking(triplets, k):
+    irs = load_collection("adi", True, tokenizer=TokenizerMode.FAST)
+    doc_triplet, query_triplet = triplets.split(".")
+    inverted_index = irs.weight_documents(WeightingTriplet.from_str(doc_triplet))
+    _, query_matrix = irs.weight_queries(WeightingTriplet.from_str(query_triplet))
+
+    exhaustive = TermAtATimeScorer().score(query_matrix, inverted_index)
+    assert_same_ranking(
+        MaxScoreScorer().top_k(query_matrix, inverted_index, k),
+        Ranking.top_k(exhaustive, inverted_index.doc_ids, k),
+    )
+
+
+def test_max_score_breaks_ties_at_k_like_exhaustive_ranking(adi_reader):
+    # Raw counts of the most frequent terms: many documents share a score
+    inverted_index = InvertedIndex.from_matrix(adi_reader.tf_matrix)
+    cols = np.sort(np.argsort(np.diff(inverted_index.offsets))[-3:])
+    query_matrix = sparse.csr_matrix((np.ones(3), cols, [0, 3]), shape=(1, len(inverted_index.terms)))
+
+    exhaustive = TermAtATimeScorer().score(query_matrix, inverted_index)
+    ordered = np.sort(exhaustive[0])[::-1]
+    k = int(np.flatnonzero(ordered[1:] == ordered[:-1])[0]) + 1
+    assert ordered[k - 1] == ordered[k] > 0
+
+    max_score = MaxScoreScorer()
+    assert_same_ranking(
+        max_score.top_k(query_matrix, inverted_index, k),
+        Ranking.top_k(exhaustive, inverted_index.doc_ids, k),
+    )
+    assert max_score.postings_visited < np.diff(inverted_index.offsets)[cols].sum()
@@ -0,0 +1,54 @@
+from pathlib import Path
+from base.choices import TokenizerMode
+from base.sweep import load_reader_class
+
+ADI_DIR = Path(__file__).resolve().parents[1] / "adi" / "data"
+
+
+def split_docs(file_path):
+    # The ADI reader before the SMART parser, splitting each section per field
+    docs = []
+    with open(file_path, "r") as f:
+        for section in f.read().split(".I")[1:]:
+            docs.append(
+                {
+                    "doc_id": int(section.split()[0]),
+                    "title": section.split(".T")[1].split(".A")[0].strip().replace("\n", " "),
+                    "author": "Unknown" if ".A" not in section else section.split(".A")[1].split(".W")[0].strip(),
+                    "content": section.split(".W")[1].strip(),
+                }
+            )
+    return docs
+
+
+def split_queries(file_path):
+    with open(file_path, "r") as f:
+        return [
+            {"query_id": int(section.split()[0]), "query": section.split(".W")[1].strip().replace("\n", " ")}
+            for section in f.read().split(".I")[1:]
+        ]
+
+
+def test_smart_docs_match_split_reader(adi_reader):
+    docs = list(adi_reader.iter_docs())
+    expected = split_docs(ADI_DIR / "adi.all")
+    assert [doc["doc_id"] for doc in docs] == [doc["doc_id"] for doc in expected]
+
+    for doc, old in zip(docs, expected):
+        assert doc["content"] == old["content"]
+
+        # Without authors, the split title ran into the content
+        if doc["title"] != old["title"]:
+            assert old["title"].startswith(doc["title"] + " .W")
+
+        # Split authors ran into a repeated title (38, 67) or stopped at the
+        # `.A` of an initial (47)
+        if doc["author"] != old["author"]:
+            assert doc["doc_id"] in (38, 47, 67)
+
+    assert [doc["author"] for doc in docs].count("Unknown") == [doc["author"] for doc in expected].count("Unknown")
+
+
+def test_smart_queries_match_split_reader():
+    query_reader = load_reader_class("adi", "query")(str(ADI_DIR / "adi.qry"), tokenizer=TokenizerMode.FAST)
+    assert query_reader.get_queries() == split_queries(ADI_DIR / "adi.qry")
@@ -2,34 +2,34 @@ from base import BaseDocReader
 
 
 class TimeDocReader(BaseDocReader):
-    def get_docs(self):
-        docs = []
+    def iter_docs(self):
+        doc_id = None
+        content = []
         with open(self.file_path, "r") as f:
-            # Get whole sections delimited by "*TEXT"
-            sections = f.read().split("*TEXT")[1:]
-            # id = 1
-
-            for section in sections:
-                if '*STOP' in section:
-                    section = section.split('*STOP')[0]
-
-                if section.strip():  # Ensure the section is not empty
-                    lines = section.strip().split('\n')
-                    first_line = lines[0].strip()
-                    doc_id = int(first_line.split()[0])
-                    
-                    content = " ".join(line.strip() for line in lines[1:] if line.strip())
-
-                    docs.append(
-                        {
+            # Documents start at "*TEXT", the file ends at "*STOP"
+            for line in f:
+                if line.startswith(("*TEXT", "*STOP")):
+                    if doc_id is not None:
+                        yield {
                             "doc_id": doc_id,
-                            "content": content,
+                            "content": " ".join(content),
                         }
-                    )
 
-                    # id += 1
-
-        return docs
+                    doc_id = None
+                    content = []
+                    if line.startswith("*STOP"):
+                        break
+
+                    # The ID follows the marker, i.e. "*TEXT 017 01/04/63 PAGE 020"
+                    doc_id = int(line[len("*TEXT"):].split()[0])
+                elif doc_id is not None and line.strip():
+                    content.append(line.strip())
+
+            if doc_id is not None:
+                yield {
+                    "doc_id": doc_id,
+                    "content": " ".join(content),
+                }
 
 
 if __name__ == "__main__":